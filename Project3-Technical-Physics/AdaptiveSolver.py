@@ -0,0 +1,412 @@
+"""Adaptive embedded Runge-Kutta solver with dense output and events.
+
+Compared to adaptiveODESolver in Project-Code.ipynb, the accepted steps are stored in growable
+buffers which double their capacity when full, so storing N steps costs O(N) instead of O(N^2).
+Every accepted step also stores the coefficients of an interpolating polynomial, so the solution
+can be sampled on any grid of times afterwards. Capsizing and the cargo hitting the railing are
+declared as Event objects, whose zero crossings are located within the step by root-finding
+instead of being checked at the step endpoints only.
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+from scipy.optimize import brentq
+
+from ShipModel import SHIP_RADIUS, DISTANCE_MC
+
+
+# Bogacki-Shampine-pair, see method1 and method2 in the notebook
+BS32 = dict(
+    c=np.array([0, 1/2, 3/4, 1]),
+    a=[np.array([]),
+       np.array([1/2]),
+       np.array([0, 3/4]),
+       np.array([2/9, 1/3, 4/9])],
+    b=np.array([2/9, 1/3, 4/9, 0]),
+    b_hat=np.array([7/24, 1/4, 1/3, 1/8]),
+    order=2,
+    dense=None,
+)
+
+# Dormand-Prince-pair, with the continuous extension of order 4 (Hairer, Norsett & Wanner)
+DP54 = dict(
+    c=np.array([0, 1/5, 3/10, 4/5, 8/9, 1, 1]),
+    a=[np.array([]),
+       np.array([1/5]),
+       np.array([3/40, 9/40]),
+       np.array([44/45, -56/15, 32/9]),
+       np.array([19372/6561, -25360/2187, 64448/6561, -212/729]),
+       np.array([9017/3168, -355/33, 46732/5247, 49/176, -5103/18656]),
+       np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84])],
+    b=np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84, 0]),
+    b_hat=np.array([5179/57600, 0, 7571/16695, 393/640, -92097/339200, 187/2100, 1/40]),
+    order=4,
+    dense=np.array([
+        [1, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+        [0, 0, 0, 0],
+        [0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+        [0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+        [0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+        [0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+        [0, 40617522/29380423, -110615467/29380423, 69997945/29380423]]),
+)
+
+METHODS = {"BS32": BS32, "DP54": DP54}
+
+
+class _GrowableArray:
+    """Array which can be appended to in amortized constant time, by doubling its capacity when full
+    """
+
+    def __init__(self, shape, capacity=1024):
+        self.data = np.empty((capacity, *shape))
+        self.size = 0
+
+    def append(self, value):
+        if self.size == len(self.data):
+            new_data = np.empty((2*len(self.data), *self.data.shape[1:]))
+            new_data[:self.size] = self.data
+            self.data = new_data
+        self.data[self.size] = value
+        self.size += 1
+
+    def view(self):
+        return self.data[:self.size]
+
+
+class Event:
+    """A function g(t, w) whose zero crossings are located during the integration
+
+    Args:
+        func (callable(float, np.ndarray)->float): event function, the event happens when it crosses zero
+        terminal (bool, optional): If True, the integration stops at the event. Defaults to False.
+        direction (int, optional): Only count crossings where g goes from negative to positive (1),
+            positive to negative (-1), or both (0). Defaults to 0.
+        action (callable(float, np.ndarray)->np.ndarray, optional): If given, returns the state
+            the integration continues from after the event. Defaults to None.
+    """
+
+    def __init__(self, func, *, terminal=False, direction=0, action=None):
+        self.func = func
+        self.terminal = terminal
+        self.direction = direction
+        self.action = action
+
+    def __call__(self, t, w):
+        return self.func(t, w)
+
+    def crosses(self, g0, g1):
+        """Returns whether the event function crosses zero in the wanted direction between g0 and g1
+        """
+        if self.direction >= 0 and g0 <= 0 < g1:
+            return True
+        if self.direction <= 0 and g0 >= 0 > g1:
+            return True
+        return False
+
+
+def _capsize_function(t, w):
+    # Negative when the ship is capsized, see isCapsized
+    yM = w[2] + DISTANCE_MC * np.cos(w[0])
+    return yM - SHIP_RADIUS*np.abs(np.sin(w[0]))
+
+
+def _stop_cargo(t, w):
+    w = w.copy()
+    w[6] = SHIP_RADIUS*np.sign(w[6])
+    w[7] = 0
+    return w
+
+
+capsize_event = Event(_capsize_function, terminal=True, direction=-1)
+railing_events = (Event(lambda t, w: w[6] - SHIP_RADIUS, direction=1, action=_stop_cargo),
+                  Event(lambda t, w: -SHIP_RADIUS - w[6], direction=1, action=_stop_cargo))
+
+
+class ODESolution:
+    """The result of adaptiveODESolverDense
+
+    Unpacks as t, w, like the result of adaptiveODESolver, so it can be used at the same call sites.
+
+    Attributes:
+        t (np.ndarray): times of the accepted steps
+        w (np.ndarray): the corresponding system states, of shape (n_state, len(t))
+        t_events (list[list[float]]): times of the located events, one list per event
+        w_events (list[list[np.ndarray]]): states at the located events, one list per event
+        status (int): 0 if tb was reached, 1 if a terminal event happened, -1 if max_steps was reached
+        nfev (int): number of evaluations of the derivative
+        n_accepted (int): number of accepted steps
+        n_rejected (int): number of rejected steps
+    """
+
+    def __init__(self, t, w, h, Q, t_events, w_events, status, nfev, n_accepted, n_rejected):
+        self.t = t
+        self.w = w
+        self._h = h
+        self._Q = Q
+        self.t_events = t_events
+        self.w_events = w_events
+        self.status = status
+        self.nfev = nfev
+        self.n_accepted = n_accepted
+        self.n_rejected = n_rejected
+
+    def __iter__(self):
+        return iter((self.t, self.w))
+
+    def __call__(self, t_eval):
+        """Samples the solution at the given times using the interpolant of each step
+
+        Args:
+            t_eval (ArrayLike): times between t[0] and t[-1]
+
+        Returns:
+            np.ndarray: the interpolated states, of shape (n_state, len(t_eval)), or (n_state,) for a scalar t_eval
+        """
+        t_eval = np.asarray(t_eval, dtype=float)
+        scalar = t_eval.ndim == 0
+        t_eval = np.atleast_1d(t_eval)
+        i = np.clip(np.searchsorted(self.t, t_eval, side="right") - 1, 0, len(self._h) - 1)
+        h = self._h[i]
+        theta = (t_eval - self.t[i]) / h
+        # w(t_i + theta*h) = w_i + h * sum_j Q_j theta^(j+1)
+        powers = theta[:, None] ** np.arange(1, self._Q.shape[2] + 1)
+        result = self.w[:, i] + (h[:, None] * np.einsum("ksj,kj->ks", self._Q[i], powers)).T
+        return result[:, 0] if scalar else result
+
+
+def _hermite_coefficients(wn, w_new, f0, f1, h):
+    # Cubic Hermite interpolant through (wn, f0) and (w_new, f1)
+    delta = (w_new - wn)/h
+    return np.stack([f0, 3*delta - 2*f0 - f1, f0 + f1 - 2*delta], axis=-1)
+
+
+def _scaled_error(error, wn, w_new, atol, rtol):
+    # Root mean square of the error, with each component measured relative to its own tolerance
+    scale = atol + rtol*np.maximum(np.abs(wn), np.abs(w_new))
+    return np.sqrt(np.mean((error/scale)**2))
+
+
+def _pi_factor(err, err_old, q, P, min_factor=0.2, max_factor=10):
+    """Step size factor of the PI controller (Gustafsson), for a scaled error where 1 is the tolerance
+
+    Args:
+        err (float): scaled error of the current step
+        err_old (float): scaled error of the previous accepted step
+        q (int): order of the error estimate plus one
+        P (float): safety factor
+
+    Returns:
+        float: factor to multiply the step size with
+    """
+    if err == 0:
+        return max_factor
+    factor = P * err**(-0.7/q) * err_old**(0.4/q)
+    return min(max_factor, max(min_factor, factor))
+
+
+def adaptiveODESolverDense(derivative, b0, ta, tb, h0, tol, P=0.8, *, method="BS32", atol=None, rtol=None,
+                           events=(), adaptive=True, max_steps=None, **fkwargs):
+    """Solves the system with an embedded Runge-Kutta pair, with dense output and event location
+
+    Takes the same arguments as adaptiveODESolver in the notebook. Without atol and rtol, the steps
+    are controlled in the same way, with the Euclidean norm of the difference between the two
+    methods as error estimate. With atol or rtol, each component of the error is scaled by its own
+    tolerance, so angles, metres and m/s can be weighted separately, and the steps are chosen by a
+    PI controller, which also uses the error of the previous step and gives smoother step sizes.
+
+    Args:
+        derivative (callable(float, np.ndarray, **kwargs)->np.ndarray): Derivative function, returns array of derivative of each element in the input array
+        b0 (np.ndarray): initial state of the system
+        ta (float): start time
+        tb (float): end time
+        h0 (float): initial size of the time step
+        tol (float): maximum allowed error estimate of an accepted step, unused if atol or rtol is given
+        P (float, optional): safety factor of the step size control. Defaults to 0.8.
+        method (str, optional): "BS32" for Bogacki-Shampine 3(2), or "DP54" for Dormand-Prince 5(4). Defaults to "BS32".
+        atol (ArrayLike, optional): absolute tolerance, scalar or one per component. Defaults to None.
+        rtol (ArrayLike, optional): relative tolerance, scalar or one per component. Defaults to None.
+        events (tuple[Event], optional): events to locate, e.g. (capsize_event, *railing_events). Defaults to ().
+        adaptive (bool, optional): If False, every step of size h0 is accepted, as in nonAdaptiveBogShamp,
+            except that steps are still cut short at events. Defaults to True.
+        max_steps (int, optional): maximum number of attempted steps, no limit if None. Defaults to None.
+
+    Returns:
+        ODESolution: the accepted steps, located events and the dense output
+    """
+    tableau = METHODS[method]
+    c, a, b, b_hat = tableau['c'], tableau['a'], tableau['b'], tableau['b_hat']
+    p = tableau['order']
+    scaled = atol is not None or rtol is not None
+    if scaled:
+        atol = np.asarray(0 if atol is None else atol, dtype=float)
+        rtol = np.asarray(0 if rtol is None else rtol, dtype=float)
+    err_old = 1e-4
+
+    wn = np.array(b0, dtype=float)
+    n_state = len(wn)
+    tn = ta
+    hn = h0
+
+    t_buf = _GrowableArray(())
+    w_buf = _GrowableArray((n_state,))
+    h_buf = _GrowableArray(())
+    Q_buf = _GrowableArray((n_state, 3 if tableau['dense'] is None else tableau['dense'].shape[1]))
+    t_buf.append(tn)
+    w_buf.append(wn)
+
+    t_events = [[] for _ in events]
+    w_events = [[] for _ in events]
+    g_prev = [event(tn, wn) for event in events]
+
+    status = 0
+    nfev = n_accepted = n_rejected = 0
+
+    k = np.empty((len(c), n_state))
+    k[0] = derivative(tn, wn, **fkwargs)
+    nfev += 1
+
+    while tn < tb - 1.0e-10:
+        if max_steps is not None and n_accepted + n_rejected >= max_steps:
+            print("Too much work")
+            status = -1
+            break
+
+        # Changes h if it is too big
+        if tn + hn > tb:
+            hn = tb - tn
+
+        for i in range(1, len(c)):
+            k[i] = derivative(tn + c[i]*hn, wn + hn*(a[i] @ k[:i]), **fkwargs)
+        nfev += len(c) - 1
+
+        w_new = wn + hn*(b @ k)
+        if scaled:
+            errorEstimate = _scaled_error(hn*((b_hat - b) @ k), wn, w_new, atol, rtol)
+            rejected = errorEstimate > 1
+        else:
+            errorEstimate = np.linalg.norm(hn*((b_hat - b) @ k), 2)
+            rejected = errorEstimate > tol
+
+        if adaptive and rejected:
+            n_rejected += 1
+            if scaled:
+                hn = max(0.2, P * errorEstimate**(-1/(p+1))) * hn
+            else:
+                hn = P * (tol/errorEstimate)**(1/(p+1)) * hn
+            continue
+
+        n_accepted += 1
+        t_new = tn + hn
+        # Both pairs are FSAL: the last stage is evaluated at the new state
+        f_new = k[-1].copy()
+        if tableau['dense'] is None:
+            Q = _hermite_coefficients(wn, w_new, k[0], f_new, hn)
+        else:
+            Q = k.T @ tableau['dense']
+
+        # Locates the first event within the step
+        def dense(t):
+            theta = (t - tn)/hn
+            return wn + hn*(Q @ theta**np.arange(1, Q.shape[1] + 1))
+
+        g_new = [event(t_new, w_new) for event in events]
+        first, t_first, project = None, t_new, []
+        for j, event in enumerate(events):
+            if not event.crosses(g_prev[j], g_new[j]):
+                continue
+            if g_prev[j] == 0:
+                # The event was already active at the start of the step, e.g. cargo resting
+                # against the railing, so its action is applied at the end of the step
+                if event.action is not None:
+                    project.append(event)
+                continue
+            # The interpolant may miss w_new by round-off, so the sign change is checked on it;
+            # if it does not change sign, the crossing is at the end of the step
+            g_start, g_end = g_prev[j], event(t_new, dense(t_new))
+            if g_end == 0 or np.sign(g_end) == np.sign(g_start):
+                t_root = t_new
+            else:
+                t_root = brentq(lambda t: event(t, dense(t)), tn, t_new, xtol=1e-12)
+            if t_root < t_first or first is None:
+                first, t_first = j, t_root
+
+        if first is not None:
+            event = events[first]
+            t_events[first].append(t_first)
+            w_first = dense(t_first)
+            w_events[first].append(w_first)
+            if event.terminal or event.action is not None:
+                t_new, w_new = t_first, w_first
+                if event.action is not None:
+                    w_new = event.action(t_new, w_new)
+                    f_new = None
+
+        for event in project:
+            w_new = event.action(t_new, w_new)
+            f_new = None
+
+        t_buf.append(t_new)
+        w_buf.append(w_new)
+        h_buf.append(hn)
+        Q_buf.append(Q)
+
+        if first is not None and events[first].terminal:
+            status = 1
+            break
+
+        # Adjusts stepsize
+        if adaptive and scaled:
+            hn = _pi_factor(errorEstimate, err_old, p + 1, P) * hn
+            err_old = max(errorEstimate, 1e-4)
+        elif adaptive:
+            if errorEstimate != 0:
+                hn = P * (tol/errorEstimate)**(1/(p+1)) * hn
+            else:
+                hn = h0
+
+        tn, wn = t_new, w_new
+        if f_new is None:
+            f_new = derivative(tn, wn, **fkwargs)
+            nfev += 1
+        k[0] = f_new
+        g_prev = [event(tn, wn) for event in events]
+
+    return ODESolution(t_buf.view().copy(), w_buf.view().T.copy(), h_buf.view().copy(), Q_buf.view().copy(),
+                       t_events, w_events, status, nfev, n_accepted, n_rejected)
+
+
+if __name__ == "__main__":
+    import time
+    from ShipModel import (SHIP_MASS, GRAV_ACC, RESONANCE_FREQUENCY, calculate_beta, adaptiveODESolver,
+                           derivativeCargoWind)
+
+    cargo_mass = 0.02*SHIP_MASS
+    fkwargs = dict(cargo_mass=cargo_mass, k_f=100, force_wind0=0.865*SHIP_MASS*GRAV_ACC,
+                   omega_omega=0.93*RESONANCE_FREQUENCY, mu=0.05)
+    beta, err = calculate_beta(cargo_mass)
+    b0 = np.array([np.deg2rad(15), np.deg2rad(-1), SHIP_RADIUS*np.cos(beta/2) - DISTANCE_MC, 0, 0, 0, 3, 0])
+
+    start = time.perf_counter()
+    t_old, w_old = adaptiveODESolver(derivativeCargoWind, b0, 0, 20, 0.01, 1e-6, **fkwargs)
+    print(f"adaptiveODESolver:      {len(t_old)} points in {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    sol = adaptiveODESolverDense(derivativeCargoWind, b0, 0, 20, 0.01, 1e-6,
+                                 events=(capsize_event, *railing_events), **fkwargs)
+    print(f"adaptiveODESolverDense: {len(sol.t)} points in {time.perf_counter() - start:.2f} s, "
+          f"{sol.n_rejected} rejected steps, status {sol.status}")
+    print(f"The cargo hit the railing at t = {np.round(sorted(sol.t_events[1] + sol.t_events[2]), 3)}")
+    if sol.t_events[0]:
+        print(f"The ship capsized at t = {sol.t_events[0][0]:.6f}")
+
+    t = np.linspace(sol.t[0], sol.t[-1], 2001)
+    plt.figure(figsize=(6, 6))
+    plt.plot(t, np.rad2deg(sol(t)[0]), label="dense output")
+    plt.plot(sol.t, np.rad2deg(sol.w[0]), ".", label="accepted steps")
+    plt.title("Angular displacement", fontsize=14)
+    plt.xlabel('Time [s]', fontsize=12)
+    plt.ylabel('$\\theta$ [deg]', fontsize=12)
+    plt.legend()
+    plt.grid(True)
+    plt.show()
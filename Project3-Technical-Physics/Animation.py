@@ -4,7 +4,10 @@ definert nederst "animate_deck_movement". Den grønne sirkelen viser posisjonen
 Man kan sende inn optional argumenter, disse står beskrevet i funksjonen. For eksempel kan man sende inn et array
 som inneholder lastens posisjon relativt metasenteret. Lasten vil da animeres som en rød sirkel.
 '''
-from pyexpat.model import XML_CQUANT_NONE
+import os
+import queue
+import threading
+
 import matplotlib.pyplot as plt
 from matplotlib import animation
 import numpy as np
@@ -18,63 +21,85 @@ R = 10  # skipets radius (m)
 h = 4 * R / (3 * np.pi)  # avstand M - C
 
 
-def init_anim():
-    """ Initialises the animation.
+def frame_geometry(t, theta, x_C, y_C, s_L=None):
+    """Beregner koordinatene til alt som tegnes, for alle frames på en gang
+
+    :param t: Array med tidsverdiene til hver frame
+    :param theta: Array med utslagsvinkelen til skipet i hver frame
+    :param x_C: Array med massesenterets x-koordinat i hver frame
+    :param y_C: Array med massesenterets y-koordinat i hver frame
+    :param s_L: Optional array med lastens posisjon relativt metasenteret
+    :return: dict med arrays der første akse er frame-nummeret
     """
+    theta, x_C, y_C = np.asarray(theta), np.asarray(x_C), np.asarray(y_C)
+    angle_values = np.linspace(0, np.pi, 100)
+    metasenter_x = x_C - h * np.sin(theta)
+    metasenter_y = y_C + h * np.cos(theta)
+    phi = angle_values[None, :] + np.pi + theta[:, None]
+    boat_x = (R * np.cos(phi) + metasenter_x[:, None]).astype(np.float32)
+    boat_y = (R * np.sin(phi) + metasenter_y[:, None]).astype(np.float32)
+    if s_L is None or len(s_L) == 0:
+        s_L = np.full(len(theta), np.nan)  # nan tegnes ikke
+    return {
+        "boat_x": boat_x, "boat_y": boat_y,
+        "deck_x": boat_x[:, [0, -1]], "deck_y": boat_y[:, [0, -1]],
+        "last_x": metasenter_x + s_L * np.cos(theta), "last_y": metasenter_y + s_L * np.sin(theta),
+        "CM_x": x_C, "CM_y": y_C,
+        "venstre_x": metasenter_x - R * np.cos(theta), "venstre_y": metasenter_y - R * np.sin(theta),
+        "høyre_x": metasenter_x + R * np.cos(theta), "høyre_y": metasenter_y + R * np.sin(theta),
+        "tekst": [r'$\theta = %.2f$' % (th * 180 / np.pi) + r"$\degree$" + '\n' + '$t =  %.2f$' % tn
+                  for th, tn in zip(theta, t)],
+        "xlim": (-R * 1.1 + np.amin(x_C), R * 1.1 + np.amax(x_C)),
+    }
 
-    global ax, boat, deck, last, CM, venstre_gjerde, høyre_gjerde, textbox_theory
-    boat, = plt.plot([], [],
-                     color="k", linewidth=1)
-    deck, = plt.plot([], [], color="k", linewidth=1)
-    sea_surface, = plt.plot([-R*10, R * 10], [0, 0],
-                            color='blue', linewidth=2)  # The surface
-    last, = plt.plot([], [], color="r", marker="o", markersize=10)
-    CM, = plt.plot([], [], color="g", marker="o", markersize=10)
-    venstre_gjerde, = plt.plot([], [], color="k", marker="|", markersize=25)
-    høyre_gjerde, = plt.plot([], [], color="k", marker="|", markersize=25)
-    ax.set_xlim([-R*1.3, R * 1.3])
+
+def init_anim(ax, xlim):
+    """ Initialises the animation.
+
+    Aksene settes én gang her og endres ikke under animasjonen, slik at blitting kan brukes.
+    """
+    artists = {}
+    artists["boat"], = ax.plot([], [], color="k", linewidth=1)
+    artists["deck"], = ax.plot([], [], color="k", linewidth=1)
+    ax.axhline(0, color='blue', linewidth=2)  # The surface
+    artists["last"], = ax.plot([], [], color="r", marker="o", markersize=10)
+    artists["CM"], = ax.plot([], [], color="g", marker="o", markersize=10)
+    artists["venstre_gjerde"], = ax.plot([], [], color="k", marker="|", markersize=25)
+    artists["høyre_gjerde"], = ax.plot([], [], color="k", marker="|", markersize=25)
+    ax.set_xlim(xlim)
     ax.set_ylim([-R*1.1, R * 1.1])
     ax.set_xlabel('$x$')
     ax.set_ylabel('$y$')
     ax.set_aspect("equal")
     props = dict(boxstyle='round', facecolor='wheat', alpha=0.5)
-    textbox_theory = ax.text(0.775, 0.95, '', transform=ax.transAxes, fontsize=12,
-                             verticalalignment='top', bbox=props)
+    artists["textbox_theory"] = ax.text(0.775, 0.95, '', transform=ax.transAxes, fontsize=12,
+                                        verticalalignment='top', bbox=props)
+    return artists
 
-    return ax, boat, deck, last, CM, venstre_gjerde, høyre_gjerde, textbox_theory
 
-
-def animate(M, theta, t, x_C, y_C, s_L, gjerde=False):
-    global ax, boat, deck, last, CM, venstre_gjerde, høyre_gjerde, textbox_theory
-    ax.set_xlim([-R * 1.1 + np.amin(x_C), R * 1.1 + np.amax(x_C)])
-    ax.set_ylim([-R*1.1, R * 1.1])
-    angle_values = np.linspace(0, np.pi, 100)
-    metasenter_x = x_C[M] - h * np.sin(theta[M])
-    metasenter_y = y_C[M] + h * np.cos(theta[M])
-    xs = R * np.cos(angle_values + np.pi + theta[M]) + metasenter_x
-    ys = R * np.sin(angle_values + np.pi + theta[M]) + metasenter_y
-    boat.set_data(xs, ys)
-    deck.set_data([xs[0], xs[-1]], [ys[0], ys[-1]])
-    if s_L[M] != -42:
-        last.set_data(metasenter_x + s_L[M] * np.cos(theta[M]),
-                      metasenter_y + s_L[M] * np.sin(theta[M]))
-    CM.set_data(x_C[M], y_C[M])
+def animate(M, artists, geometry, gjerde=False):
+    """Oppdaterer figuren til frame M, bare ved å slå opp i de ferdig beregnede koordinatene
+    """
+    g = geometry
+    artists["boat"].set_data(g["boat_x"][M], g["boat_y"][M])
+    artists["deck"].set_data(g["deck_x"][M], g["deck_y"][M])
+    artists["last"].set_data([g["last_x"][M]], [g["last_y"][M]])
+    artists["CM"].set_data([g["CM_x"][M]], [g["CM_y"][M]])
     if gjerde:
-        venstre_gjerde.set_data(
-            [metasenter_x - R * np.cos(theta[M])], [metasenter_y - R * np.sin(theta[M])])
-        høyre_gjerde.set_data(
-            [metasenter_x + R * np.cos(theta[M])], [metasenter_y + R * np.sin(theta[M])])
-    theta_string = r'$\theta = %.2f$' % (
-        theta[M] * 180 / np.pi) + r"$\degree$"
-    time_string = '$t =  %.2f$' % (t[M])
-    textbox_theory.set_text(
-        theta_string + '\n' + time_string)
+        artists["venstre_gjerde"].set_data([g["venstre_x"][M]], [g["venstre_y"][M]])
+        artists["høyre_gjerde"].set_data([g["høyre_x"][M]], [g["høyre_y"][M]])
+    artists["textbox_theory"].set_text(g["tekst"][M])
+    return tuple(artists.values())
 
-    M += 1
-    return ax, boat, deck, last, CM, venstre_gjerde, høyre_gjerde, textbox_theory
+
+def _decimate(t, theta, x_C, y_C, s_L, stepsize):
+    dt = t[1] - t[0]
+    skips = max(int(stepsize / dt), 1)
+    s_L_anim = None if s_L is None or len(s_L) == 0 else s_L[::skips]
+    return t[::skips], theta[::skips], x_C[::skips], y_C[::skips], s_L_anim
 
 
-def animate_deck_movement(t, theta, x_C, y_C, s_L=None, gjerde=False, stepsize=0.01, vis_akse_verdier=False):
+def animate_deck_movement(t, theta, x_C, y_C, s_L=None, gjerde=False, stepsize=0.01, vis_akse_verdier=False, show=True):
     """
 
     :param t: Array som inneholder tidsverdiene man har beregnet \vec{w} for systemet
@@ -85,34 +110,239 @@ def animate_deck_movement(t, theta, x_C, y_C, s_L=None, gjerde=False, stepsize=0
     :param gjerde: Optional Boolean som forteller om vi skal tegne inn gjerder på skipet
     :param stepsize: Hvor lang tid som skal gå mellom hver frame
     :param vis_akse_verdier: Hvis akse-verdier vises går animasjonen litt mer hakkete, men man kan se tallverdier
+    :param show: Om plt.show() skal kalles. Hvis False returneres animasjonen uten å vises
     :return: Animasjon som viser dynamikken til skipet
     """
-    if s_L is None:
-        s_L = []
-    global fig, ax
+    t_anim, theta_anim, x_C_anim, y_C_anim, s_L_anim = _decimate(t, theta, x_C, y_C, s_L, stepsize)
+    geometry = frame_geometry(t_anim, theta_anim, x_C_anim, y_C_anim, s_L_anim)
     fig, ax = plt.subplots()
-    dt = t[1] - t[0]
-    skips = max(int(stepsize / dt), 1)
-    theta_anim = theta[::skips]
-    t_anim = t[::skips]
-    x_C_anim = x_C[::skips]
-    y_C_anim = y_C[::skips]
-    if len(s_L) == 0:
-        s_L_anim = -42 * np.ones(len(theta_anim))
-    else:
-        s_L_anim = s_L[::skips]
-    h_anim = animation.FuncAnimation(fig, animate, init_func=init_anim, frames=len(t_anim) - 1, interval=1,
-                                     blit=not vis_akse_verdier,
-                                     fargs=(theta_anim, t_anim, x_C_anim, y_C_anim, s_L_anim, gjerde))
-    plt.show()
+    artists = init_anim(ax, geometry["xlim"])
+    h_anim = animation.FuncAnimation(fig, animate, init_func=lambda: tuple(artists.values()),
+                                     frames=len(t_anim) - 1, interval=1, blit=not vis_akse_verdier,
+                                     fargs=(artists, geometry, gjerde))
+    if show:
+        plt.show()
+    return h_anim
+
+
+def _render_frames(geometry, first, gjerde, xlim, figsize, dpi, frame_dir):
+    """Tegner en del av framene i en egen prosess, enten til png-filer i frame_dir, eller til RGB-arrays
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    fig, ax = plt.subplots(figsize=figsize, dpi=dpi)
+    artists = init_anim(ax, xlim)
+    frames = []
+    for M in range(len(geometry["tekst"])):
+        animate(M, artists, geometry, gjerde)
+        if frame_dir is None:
+            fig.canvas.draw()
+            frames.append(np.asarray(fig.canvas.buffer_rgba())[:, :, :3].copy())
+        else:
+            fig.savefig(os.path.join(frame_dir, f"frame_{first + M:06d}.png"))
+    plt.close(fig)
+    return frames
+
 
+def export_deck_movement(t, theta, x_C, y_C, s_L=None, gjerde=False, stepsize=0.01, filename="animasjon.mp4",
+                         fps=None, processes=None, chunk_frames=50, figsize=(6.4, 4.8), dpi=100):
+    """Lagrer animasjonen uten å vise den, med framene tegnet parallelt i flere prosesser
 
+    Hvis filename er en mappe, eller ffmpeg ikke er installert, lagres framene som png-filer i en mappe.
+    Ellers sendes framene i riktig rekkefølge til ffmpeg, som lager videoen.
+
+    :param t, theta, x_C, y_C, s_L, gjerde, stepsize: Som i animate_deck_movement
+    :param filename: Videofil, f.eks. "animasjon.mp4", eller mappe for png-filer
+    :param fps: Frames per sekund i videoen. Hvis None vises animasjonen i sann tid
+    :param processes: Antall prosesser som tegner, alle kjerner hvis None
+    :param chunk_frames: Antall frames hver prosess tegner om gangen. Bare 2*processes chunks er under
+        arbeid eller venter på å bli skrevet om gangen, så minnebruken avhenger ikke av lengden på videoen
+    :param figsize: Størrelsen på figuren i tommer
+    :param dpi: Oppløsningen til figuren
+    :return: Filnavnet til videoen, eller mappen med png-filer
+    :raises ValueError: Hvis t har færre enn to tidsverdier, slik at det ikke er noen frames å lagre
+    """
+    import shutil
+    import subprocess
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
 
-# ax, boat, deck, last, CM, venstre_gjerde, høyre_gjerde, textbox_theory = init_anim()
+    if len(t) < 2:
+        raise ValueError(f"Trenger minst to tidsverdier for å lage en animasjon, fikk {len(t)}")
+    t_anim, theta_anim, x_C_anim, y_C_anim, s_L_anim = _decimate(t, theta, x_C, y_C, s_L, stepsize)
+    geometry = frame_geometry(t_anim, theta_anim, x_C_anim, y_C_anim, s_L_anim)
+    xlim = geometry.pop("xlim")
+    fps = fps or max(int(round(1 / (t_anim[1] - t_anim[0]))), 1)
+    n_frames = len(t_anim)
+    processes = processes or os.cpu_count() or 1
 
-# ax, boat, deck, last, CM, venstre_gjerde, høyre_gjerde, textbox_theory = animate()
+    ffmpeg = shutil.which("ffmpeg")
+    as_images = os.path.splitext(filename)[1] == "" or ffmpeg is None
+    frame_dir = None
+    if as_images:
+        frame_dir = os.path.splitext(filename)[0]
+        os.makedirs(frame_dir, exist_ok=True)
+    encoder = None
+
+    def write(frames):
+        nonlocal encoder
+        if as_images:
+            return
+        if encoder is None:
+            # matplotlib runder av størrelsen på figuren, så størrelsen tas fra den første framen
+            height, width = frames[0].shape[:2]
+            encoder = subprocess.Popen([ffmpeg, "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24",
+                                        "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+                                        "-pix_fmt", "yuv420p", filename], stdin=subprocess.PIPE)
+        for frame in frames:
+            encoder.stdin.write(frame.tobytes())
+
+    with ProcessPoolExecutor(processes) as executor:
+        in_flight = deque()
+        for first in range(0, n_frames, chunk_frames):
+            chunk = {key: value[first:first + chunk_frames] for key, value in geometry.items()}
+            in_flight.append(executor.submit(_render_frames, chunk, first, gjerde, xlim, figsize, dpi, frame_dir))
+            if len(in_flight) >= 2 * processes:
+                write(in_flight.popleft().result())
+        while in_flight:
+            write(in_flight.popleft().result())
+
+    if as_images:
+        return frame_dir
+    encoder.stdin.close()
+    encoder.wait()
+    return filename
+
+
+def _stream_frames(chunks, frames, stepsize, stats, stop, drop_frames=False, writer=None):
+    """Leser chunks fra en simulering, og legger hver frame i køen frames
+
+    Når køen er full venter simuleringen på tegningen, eller hvis drop_frames er True, kastes den eldste
+    framen, slik at simuleringen aldri må vente. Simuleringen stopper når stop settes (vinduet lukkes).
+    Hvis simuleringen feiler, lagres feilen i stats["error"]. writer lukkes og køen avsluttes uansett.
+    """
+    put = _put_dropping_oldest if drop_frames else _put_waiting
+    t_0 = None
+    last_frame = -1
+    try:
+        for t, w in chunks:
+            if writer is not None:
+                writer.append(t, w)
+            if t_0 is None:
+                t_0 = t[0]
+            # Første tidssteg i hvert intervall av lengde stepsize blir en frame
+            frame_number = np.floor((t - t_0) / stepsize + 1e-9).astype(int)
+            numbers, first = np.unique(frame_number, return_index=True)
+            selected = first[numbers > last_frame]
+            if not len(selected):
+                continue
+            last_frame = frame_number[selected[-1]]
+            s_L = w[6, selected] if len(w) > 6 else None
+            geometry = frame_geometry(t[selected], w[0, selected], w[4, selected], w[2, selected], s_L)
+            del geometry["xlim"]
+            for M in range(len(selected)):
+                put(frames, {key: value[M:M + 1] for key, value in geometry.items()}, stats, stop)
+            stats["frames"] += len(selected)
+            if stop.is_set():
+                break
+    except Exception as error:
+        stats["error"] = error
+    finally:
+        try:
+            if writer is not None:
+                writer.close()  # det som ble simulert før en feil lagres også
+        finally:
+            put(frames, None, stats, stop)  # simuleringen er ferdig
 
-def animatethatshit(t, w, gjerde=False):
+
+def _put_waiting(frames, frame, stats, stop):
+    while not stop.is_set():
+        try:
+            frames.put(frame, timeout=0.1)
+            return
+        except queue.Full:
+            pass
+
+
+def _put_dropping_oldest(frames, frame, stats, stop):
+    while True:
+        try:
+            frames.put_nowait(frame)
+            return
+        except queue.Full:
+            try:
+                frames.get_nowait()
+                stats["dropped"] += 1
+            except queue.Empty:
+                pass
+
+
+def stream_deck_movement(chunks, gjerde=False, stepsize=0.01, queue_size=100, xlim=(-R * 3, R * 3), drop_frames=False,
+                         writer=None, show=True):
+    """Animerer skipet mens det simuleres
+
+    Simuleringen kjøres i en egen tråd, og framene sendes til animasjonen gjennom en kø med plass til
+    queue_size frames, så minnebruken er den samme uansett hvor lenge simuleringen går. Animasjonen vises
+    i sann tid, med en frame per stepsize sekunder, og simuleringen venter når køen er full. Simuleringen
+    stopper når vinduet lukkes.
+
+    :param chunks: Iterator som gir (t, w) for en bit av simuleringen om gangen, f.eks. RK4RailingStream
+        fra CompiledRK4, eller iter_chunks fra TrajectoryStore
+    :param gjerde: Optional Boolean som forteller om vi skal tegne inn gjerder på skipet
+    :param stepsize: Hvor lang tid som skal gå mellom hver frame
+    :param queue_size: Hvor mange frames som kan ligge i køen
+    :param xlim: Fast x-akse. Hvis None følger aksen etter skipet, men da kan ikke blitting brukes
+    :param drop_frames: Hvis True venter ikke simuleringen på tegningen, men de eldste framene i køen kastes
+        når tegningen ikke holder følge, slik at animasjonen hopper fremover
+    :param writer: Optional TrajectoryWriter som hele simuleringen også skrives til
+    :param show: Om plt.show() skal kalles. Hvis False returneres animasjonen uten å vises
+    :return: Animasjonen, og en dict med antall frames, antall frames som ble kastet, og feilen simuleringen
+        stoppet med under "error" (None hvis den gikk bra). Feilen kastes også videre når animasjonen når den
+    """
+    frames = queue.Queue(maxsize=queue_size)
+    stats = {"frames": 0, "dropped": 0, "error": None}
+    stop = threading.Event()
+    solver = threading.Thread(target=_stream_frames, args=(chunks, frames, stepsize, stats, stop, drop_frames, writer),
+                              daemon=True)
+    solver.start()
+
+    fig, ax = plt.subplots()
+    fig.canvas.mpl_connect("close_event", lambda event: stop.set())
+    follow = xlim is None
+    artists = init_anim(ax, (-R * 3, R * 3) if follow else xlim)
+
+    def next_frame():
+        while True:
+            try:
+                frame = frames.get(timeout=0.05)
+            except queue.Empty:
+                yield None  # ingen ny frame ennå, tegner den forrige på nytt
+                continue
+            if frame is None:
+                if stats["error"] is not None:
+                    raise stats["error"]
+                return
+            yield frame
+
+    def update(frame):
+        if frame is None:
+            return tuple(artists.values())
+        if follow:
+            left, right = ax.get_xlim()
+            if not left + R < frame["CM_x"][0] < right - R:
+                ax.set_xlim(frame["CM_x"][0] - (right - left) / 2, frame["CM_x"][0] + (right - left) / 2)
+        return animate(0, artists, frame, gjerde)
+
+    h_anim = animation.FuncAnimation(fig, update, init_func=lambda: tuple(artists.values()), frames=next_frame,
+                                     interval=1000 * stepsize, blit=not follow, cache_frame_data=False)
+    if show:
+        plt.show()
+        stop.set()
+        solver.join()  # writer er lukket når funksjonen returnerer
+    return h_anim, stats
+
+
+def animatethatshit(t, w, gjerde=False, filename=None):
     theta = w[0]
     x_C = w[4]
     y_C = w[2]
@@ -120,6 +350,8 @@ def animatethatshit(t, w, gjerde=False):
     if len(w) > 6:
         s_L = w[6]
 
+    if filename is not None:
+        return export_deck_movement(t, theta, x_C, y_C, s_L, gjerde=True, stepsize=0.1, filename=filename)
     animate_deck_movement(t, theta, x_C, y_C, s_L, gjerde=True, stepsize = 0.1)
 
 
@@ -128,20 +360,68 @@ def loadFile(filename):
     return f["t"], f["w"]
 
 
+def loadRun(store, record, stepsize=0.1, t_min=-np.inf, t_max=np.inf):
+    """Laster inn en kjøring fra en TrajectoryStore, med bare omtrent ett tidssteg per stepsize sekunder
+
+    :param store: TrajectoryStore som inneholder kjøringen
+    :param record: Kjøringen, slik den står i store.index() eller store.find()
+    :param stepsize: Hvor lang tid som skal gå mellom hver frame
+    :param t_min: Starten av tidsvinduet som skal lastes inn
+    :param t_max: Slutten av tidsvinduet som skal lastes inn
+    :return: t og w, med bare hver frame lest inn fra disk
+    """
+    dt = record["params"].get("dt")
+    step = max(int(stepsize / dt), 1) if dt else 1
+    return store.load(record["run_id"], t_min, t_max, step=step)
+
+
+def liveBeat(tb=3600, dt=0.005, stepsize=0.05, store=None, drop_frames=False):
+    """Viser testBeat fra notatboken i sann tid mens den simuleres, over så lang tid man vil
+
+    :param tb: Hvor lenge simuleringen skal gå
+    :param dt: Tidssteget til RK4
+    :param stepsize: Hvor lang tid som skal gå mellom hver frame
+    :param store: Optional TrajectoryStore som simuleringen lagres i mens den vises
+    :param drop_frames: Som i stream_deck_movement
+    """
+    from ShipModel import SHIP_MASS, SHIP_RADIUS, DISTANCE_MC, GRAV_ACC, RESONANCE_FREQUENCY, calculate_beta
+    from CompiledRK4 import RK4RailingStream, derivative_wind_friction_kernel
+
+    fkwargs = dict(cargo_mass=0, k_f=100, force_wind0=0.625*SHIP_MASS*GRAV_ACC, omega_omega=0.93*RESONANCE_FREQUENCY)
+    beta, err = calculate_beta(0)
+    b0 = np.array([0, np.deg2rad(2), SHIP_RADIUS*np.cos(beta/2) - DISTANCE_MC, 0, 0, 0, 3, 0])
+    chunks = RK4RailingStream(derivative_wind_friction_kernel, b0, 0, tb, dt, **fkwargs)
+    writer = None
+    if store is not None:
+        writer = store.open_run("Beat", solver="RK4RailingStream", ta=0, tb=tb, dt=dt, b0=b0, **fkwargs)
+    h_anim, stats = stream_deck_movement(chunks, gjerde=True, stepsize=stepsize, drop_frames=drop_frames, writer=writer)
+    print(f"{stats['frames']} frames, {stats['dropped']} kastet")
+
+
 def main():
-    import os
-    files = os.listdir(".")
+    """Velger en kjøring fra listen og animerer den. Hvis et filnavn er gitt som argument, f.eks.
+    "python Animation.py animasjon.mp4", lagres animasjonen der i stedet for å vises.
+    Med "python Animation.py --live" vises testBeat mens den simuleres
+    """
+    import sys
+    if "--live" in sys.argv:
+        liveBeat()
+        return
+    from TrajectoryStore import TrajectoryStore
+    store = TrajectoryStore("trajectories")
+    records = store.index()
     print("0)\t[Quit]")
-    for i, name in enumerate(files):
-        print(f"{i+1})\t{name}")
-    index = input(f"Select file [0-{len(files)}]: ")
-    while not index.isnumeric() or int(index) < 0 or int(index) > len(files):
-        index = input(f"Select file [0-{len(files)}]: ")
+    for i, record in enumerate(records):
+        params = ", ".join(f"{key}={value:.4g}" for key, value in record["params"].items() if isinstance(value, (int, float)))
+        print(f"{i+1})\t{record['kind']} ({record['solver']}) {params}")
+    index = input(f"Select run [0-{len(records)}]: ")
+    while not index.isnumeric() or int(index) < 0 or int(index) > len(records):
+        index = input(f"Select run [0-{len(records)}]: ")
     index = int(index)
     if index:
-        filename = files[index-1]
-        t, w = loadFile(filename)
-        animatethatshit(t, w)
+        t, w = loadRun(store, records[index-1])
+        filename = sys.argv[1] if len(sys.argv) > 1 else None
+        animatethatshit(t, w, filename=filename)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,211 @@
+"""Maps the capsize / no-capsize boundary in the (theta_0, omega_0) plane.
+
+capsizeOmegaLimit in the notebook finds the capsize threshold for theta_0 = 0 only, with a full
+20 s simulation per bisection step. Here the plane is covered by a quadtree: a cell is only split
+into four when its corners disagree on whether the ship capsizes, so the simulations are spent
+along the boundary. The corner simulations of each level run in parallel worker processes, use
+the compiled integrator which stops as soon as the ship capsizes, and are skipped entirely for
+ships without cargo whose energy is too low to ever reach a capsized state.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from ShipModel import (SHIP_RADIUS, SHIP_MASS, SHIP_INERTIA, DISTANCE_MC, GRAV_ACC, WATER_DENSITY, BETA,
+                       calculate_beta)
+
+
+def _submerged_area_integral(u):
+    # Antiderivative of (arccos(u) - u*sqrt(1 - u^2)) du, the submerged area divided by R² written
+    # in terms of u = cos(gamma/2)
+    root = np.sqrt(1 - u**2)
+    return u*np.arccos(u) - root + root**3/3
+
+
+def ship_energy(w, beta=BETA):
+    """Calculates the mechanical energy of a ship without cargo, wind or friction
+
+    The buoyancy force only depends on the height of the metacenter above its equilibrium height,
+    z = y_C - y_C_0 - DISTANCE_MC*(1 - cos(theta)), so the system is conservative with the
+    potential m*g*y_C - integral of the buoyancy force over z.
+
+    Args:
+        w (np.ndarray): state [theta, omega, y_C, v_yC, x_C, v_xC, ...], or an array of such states along axis 0
+        beta (float, optional): central angle of the ship at equilibrium. Defaults to BETA.
+
+    Returns:
+        ArrayLike: the energy, relative to the ship at rest in equilibrium
+    """
+    y_C_0 = SHIP_RADIUS*np.cos(beta/2) - DISTANCE_MC
+    return (0.5*SHIP_INERTIA*w[1]**2 + 0.5*SHIP_MASS*(w[3]**2 + w[5]**2)
+            + _potential_energy(w[0], w[2] - y_C_0, beta))
+
+
+def _potential_energy(theta, delta_Yc, beta=BETA):
+    u0 = np.cos(beta/2)
+    u = u0 + (delta_Yc - DISTANCE_MC*(1 - np.cos(theta)))/SHIP_RADIUS
+    buoyancy_work = GRAV_ACC*WATER_DENSITY*SHIP_RADIUS**3*(_submerged_area_integral(u) - _submerged_area_integral(u0))
+    return SHIP_MASS*GRAV_ACC*delta_Yc - buoyancy_work
+
+
+def capsize_energy_barrier(beta=BETA, num_points=10_001):
+    """Calculates the lowest potential energy of a state on the edge of capsizing
+
+    On the edge, y_M = SHIP_RADIUS*|sin(theta)|. A ship without cargo, wind or friction with less
+    energy than this can never capsize.
+
+    Args:
+        beta (float, optional): central angle of the ship at equilibrium. Defaults to BETA.
+        num_points (int, optional): number of angles to minimise over. Defaults to 10_001.
+
+    Returns:
+        float: the energy barrier
+    """
+    theta = np.linspace(0, np.pi/2, num_points)
+    y_C = SHIP_RADIUS*np.sin(theta) - DISTANCE_MC*np.cos(theta)
+    y_C_0 = SHIP_RADIUS*np.cos(beta/2) - DISTANCE_MC
+    return np.min(_potential_energy(theta, y_C - y_C_0, beta))
+
+
+def _simulate_batch(points, cargo_mass, s_L_0, tb, dt):
+    """Simulates the ship from each (theta_0, omega_0) in points, and returns whether it capsized
+    """
+    from CompiledRK4 import RK4CapsizedJit, RK4RailingJit, derivative_torque_calc_area_kernel, derivative_cargo_kernel
+
+    beta, err = calculate_beta(cargo_mass)
+    y_C_0 = SHIP_RADIUS*np.cos(beta/2) - DISTANCE_MC
+    capsized = np.zeros(len(points), dtype=bool)
+    for n, (theta_0, omega_0) in enumerate(points):
+        if cargo_mass == 0:
+            b0 = np.array([theta_0, omega_0, y_C_0, 0, 0, 0])
+            t, w, capsized[n] = RK4CapsizedJit(derivative_torque_calc_area_kernel, b0, 0, tb, dt)
+        else:
+            b0 = np.array([theta_0, omega_0, y_C_0, 0, 0, 0, s_L_0, 0])
+            stats = {}
+            RK4RailingJit(derivative_cargo_kernel, b0, 0, tb, dt, stats=stats, cargo_mass=cargo_mass)
+            capsized[n] = stats['capsized']
+    return capsized
+
+
+def capsizeBasin(theta_range=(-np.pi/2, np.pi/2), omega_range=(-1.5, 1.5), *, cargo_mass=0, s_L_0=3,
+                 initial_cells=8, max_depth=5, tb=20, dt=0.01, processes=None):
+    """Maps the capsize boundary in (theta_0, omega_0) with an adaptive quadtree
+
+    Starts with initial_cells x initial_cells cells, and splits every cell whose four corners
+    disagree on whether the ship capsizes, up to max_depth times. Boundary features smaller than
+    the initial cells can be missed if all corners of a cell agree.
+
+    Args:
+        theta_range (tuple[float, float], optional): range of initial angles. Defaults to (-pi/2, pi/2).
+        omega_range (tuple[float, float], optional): range of initial angular velocities. Defaults to (-1.5, 1.5).
+        cargo_mass (float, optional): Total mass of the cargo, held by railings. Defaults to 0.
+        s_L_0 (float, optional): initial position of the cargo. Defaults to 3.
+        initial_cells (int, optional): number of cells along each axis before refining. Defaults to 8.
+        max_depth (int, optional): maximum number of times a cell is split. Defaults to 5.
+        tb (float, optional): simulated time. Defaults to 20.
+        dt (float, optional): size of the time step. Defaults to 0.01.
+        processes (int, optional): number of worker processes, all cores if None, no workers if 1. Defaults to None.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray, int]: boundary segments of shape (n, 2, 2), the evaluated
+        points of shape (m, 2), whether the ship capsized from each point, and the number of simulations run
+    """
+    scale = 2**max_depth
+    size = initial_cells*scale  # points are stored on an integer lattice of the finest level
+    theta_step = (theta_range[1] - theta_range[0])/size
+    omega_step = (omega_range[1] - omega_range[0])/size
+    barrier = capsize_energy_barrier() if cargo_mass == 0 else None
+
+    processes = processes or os.cpu_count()
+    executor = ProcessPoolExecutor(processes) if processes > 1 else None
+    results = {}
+    n_simulations = 0
+
+    def evaluate(lattice_points):
+        nonlocal n_simulations
+        lattice_points = [p for p in dict.fromkeys(lattice_points) if p not in results]
+        if not lattice_points:
+            return
+        points = np.array([(theta_range[0] + i*theta_step, omega_range[0] + j*omega_step) for i, j in lattice_points])
+        capsized = np.zeros(len(points), dtype=bool)
+        simulate = np.ones(len(points), dtype=bool)
+        if barrier is not None:
+            w0 = np.zeros((6, len(points)))
+            w0[0], w0[1], w0[2] = points[:, 0], points[:, 1], SHIP_RADIUS*np.cos(BETA/2) - DISTANCE_MC
+            simulate = ship_energy(w0) >= barrier
+        batch = points[simulate]
+        n_simulations += len(batch)
+        if executor is None or len(batch) < 2:
+            capsized[simulate] = _simulate_batch(batch, cargo_mass, s_L_0, tb, dt)
+        else:
+            chunks = np.array_split(batch, min(len(batch), 4*processes))
+            futures = [executor.submit(_simulate_batch, chunk, cargo_mass, s_L_0, tb, dt) for chunk in chunks]
+            capsized[simulate] = np.concatenate([future.result() for future in futures])
+        results.update(zip(lattice_points, capsized))
+
+    def corners(cell):
+        i, j, step = cell
+        return [(i, j), (i + step, j), (i, j + step), (i + step, j + step)]
+
+    try:
+        cells = [(i*scale, j*scale, scale) for i in range(initial_cells) for j in range(initial_cells)]
+        boundary_cells = []
+        while cells:
+            evaluate([p for cell in cells for p in corners(cell)])
+            mixed = [cell for cell in cells if len({results[p] for p in corners(cell)}) > 1]
+            if not mixed or mixed[0][2] == 1:
+                boundary_cells = mixed
+                break
+            cells = [(i + di, j + dj, step//2) for i, j, step in mixed
+                     for di in (0, step//2) for dj in (0, step//2)]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # Boundary segments join the midpoints of the cell edges whose ends disagree
+    segments = []
+    for cell in boundary_cells:
+        p00, p10, p01, p11 = corners(cell)
+        crossings = [((a[0] + b[0])/2, (a[1] + b[1])/2) for a, b in ((p00, p10), (p10, p11), (p11, p01), (p01, p00))
+                     if results[a] != results[b]]
+        for k in range(0, len(crossings) - 1, 2):
+            segments.append(crossings[k:k+2])
+    segments = np.array(segments).reshape(-1, 2, 2)
+    segments[..., 0] = theta_range[0] + segments[..., 0]*theta_step
+    segments[..., 1] = omega_range[0] + segments[..., 1]*omega_step
+
+    lattice_points = list(results)
+    points = np.array([(theta_range[0] + i*theta_step, omega_range[0] + j*omega_step) for i, j in lattice_points])
+    capsized = np.array([results[p] for p in lattice_points])
+    return segments, points, capsized, n_simulations
+
+
+def plotCapsizeBasins(cargo_mass_ratios=(0, 0.02, 0.08), **kwargs):
+    """Maps and plots the capsize boundary for different cargo masses
+
+    Args:
+        cargo_mass_ratios (tuple[float], optional): cargo masses as fractions of the ship's mass. Defaults to (0, 0.02, 0.08).
+        kwargs: passed to capsizeBasin
+    """
+    fig, axes = plt.subplots(1, len(cargo_mass_ratios), figsize=(5*len(cargo_mass_ratios), 5))
+    for ax, mass_ratio in zip(np.atleast_1d(axes), cargo_mass_ratios):
+        segments, points, capsized, n_simulations = capsizeBasin(cargo_mass=mass_ratio*SHIP_MASS, **kwargs)
+        print(f'Mass ratio of ship: {mass_ratio}, {n_simulations} simulations for {len(points)} points')
+        ax.scatter(np.rad2deg(points[capsized, 0]), np.rad2deg(points[capsized, 1]), s=2, color="r", label="capsizes")
+        ax.scatter(np.rad2deg(points[~capsized, 0]), np.rad2deg(points[~capsized, 1]), s=2, color="b", label="stable")
+        for segment in segments:
+            ax.plot(np.rad2deg(segment[:, 0]), np.rad2deg(segment[:, 1]), color="k")
+        ax.set_title(f"Capsize boundary, mass ratio {mass_ratio}", fontsize=14)
+        ax.set_xlabel('$\\theta_0$ [deg]', fontsize=12)
+        ax.set_ylabel('$\\omega_0$ [deg/s]', fontsize=12)
+        ax.legend()
+        ax.grid(True)
+    plt.tight_layout()
+    plt.show()
+
+
+if __name__ == "__main__":
+    plotCapsizeBasins()
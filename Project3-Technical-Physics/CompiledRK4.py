@@ -0,0 +1,356 @@
+"""Compiled (numba) versions of the RK4 integrators and right-hand sides from Project-Code.ipynb.
+
+The derivative kernels take a ShipParams tuple instead of **kwargs, with the constants that only
+depend on beta precomputed once per run, and write into a preallocated array instead of building a
+new one on every call. The stepping loop, including the railing and capsize checks, is compiled as
+well, and is specialised for each derivative kernel it is given. The arithmetic is done in the same
+order as in the notebook, so the trajectories agree with RK4, RK4Capsized and RK4Railing.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+from numba import njit
+
+from ShipModel import (SHIP_RADIUS, SHIP_MASS, SHIP_INERTIA, DISTANCE_MC, GRAV_ACC, WATER_DENSITY,
+                       BETA, calculate_beta)
+
+
+ShipParams = namedtuple("ShipParams", ["cargo_mass", "k_f", "force_wind0", "omega_omega", "mu",
+                                       "beta", "cos_half_beta", "y_C_0"])
+
+
+def make_params(cargo_mass=0, k_f=0, force_wind0=0, omega_omega=0, mu=0, beta=BETA):
+    """Builds the typed parameter tuple passed to the compiled kernels
+
+    Args:
+        cargo_mass (float, optional): Total mass of the cargo. Defaults to 0.
+        k_f (float, optional): Friction coefficient. Defaults to 0.
+        force_wind0 (float, optional): Amplitude of the wind force. Defaults to 0.
+        omega_omega (float, optional): Frequency of the wind. Defaults to 0.
+        mu (float, optional): Kinetic friction coefficient of the cargo. Defaults to 0.
+        beta (float, optional): Central angle of the ship at equilibrium. Defaults to BETA.
+
+    Returns:
+        ShipParams: the parameters, with the beta-dependent constants precomputed
+    """
+    y_M_0 = SHIP_RADIUS*np.cos(beta/2)
+    y_C_0 = y_M_0 - DISTANCE_MC
+    return ShipParams(float(cargo_mass), float(k_f), float(force_wind0), float(omega_omega), float(mu),
+                      float(beta), float(np.cos(beta*0.5)), float(y_C_0))
+
+
+@njit
+def _gamma(w, p):
+    delta_Yc = w[2] - p.y_C_0
+    return 2*np.arccos(p.cos_half_beta - (4/(3*np.pi)) * (1 - np.cos(w[0])) + delta_Yc/SHIP_RADIUS)
+
+
+@njit
+def derivative_torque_calc_area_kernel(t, w, p, out):
+    """Compiled derivative_torque_calc_area, writes [d theta, d omega, d y_C, d v_yC, d x_C, d v_xC] into out
+    """
+    gamma = _gamma(w, p)
+    area_water = 0.5*SHIP_RADIUS**2 * (gamma - np.sin(gamma))
+    force_buoy = GRAV_ACC*WATER_DENSITY*area_water  # [N] buoyancy force
+    force_grav = SHIP_MASS*GRAV_ACC
+    out[0] = w[1]
+    out[1] = -force_buoy*DISTANCE_MC*np.sin(w[0]) / SHIP_INERTIA
+    out[2] = w[3]
+    out[3] = (force_buoy - force_grav)/SHIP_MASS
+    out[4] = w[5]
+    out[5] = 0
+
+
+@njit
+def derivative_cargo_kernel(t, w, p, out):
+    """Compiled derivative_cargo, writes [d theta, d omega, d y_C, d v_yC, d x_C, d v_xC, d s_L, d v_L] into out
+    """
+    gamma = _gamma(w, p)
+    area_water = 0.5*SHIP_RADIUS**2 * (gamma - np.sin(gamma))
+    force_buoy = GRAV_ACC*WATER_DENSITY*area_water  # [N] buoyancy force
+    force_grav = GRAV_ACC*SHIP_MASS
+    force_cargo_normal = GRAV_ACC*p.cargo_mass*np.cos(w[0])
+    out[0] = w[1]
+    out[1] = (-force_buoy*DISTANCE_MC*np.sin(w[0]) - force_cargo_normal*w[6])/SHIP_INERTIA
+    out[2] = w[3]
+    out[3] = (force_buoy - force_grav - force_cargo_normal*np.cos(w[0]))/SHIP_MASS
+    out[4] = w[5]
+    out[5] = force_cargo_normal*np.sin(w[0])/SHIP_MASS
+    out[6] = w[7]
+    out[7] = -GRAV_ACC * np.sin(w[0])
+
+
+@njit
+def derivative_wind_friction_kernel(t, w, p, out):
+    """Compiled derivative_wind_friction, writes [d theta, d omega, d y_C, d v_yC, d x_C, d v_xC, d s_L, d v_L] into out
+    """
+    gamma = _gamma(w, p)
+    area_water = 0.5*SHIP_RADIUS**2 * (gamma - np.sin(gamma))
+    force_buoy = GRAV_ACC*WATER_DENSITY*area_water  # [N] buoyancy force
+    force_grav = GRAV_ACC*SHIP_MASS
+    force_cargo_normal = GRAV_ACC*p.cargo_mass*np.cos(w[0])
+
+    force_wind = p.force_wind0*np.cos(p.omega_omega * t)
+    force_friction = p.k_f * SHIP_RADIUS * gamma * w[1]
+
+    out[0] = w[1]
+    out[1] = (-force_buoy*DISTANCE_MC*np.sin(w[0]) - force_cargo_normal*w[6] + force_wind*w[2] - force_friction * (w[2] + SHIP_RADIUS*(1 - np.cos(gamma/2)))) / SHIP_INERTIA
+    out[2] = w[3]
+    out[3] = (force_buoy - force_grav - force_cargo_normal*np.cos(w[0]))/SHIP_MASS
+    out[4] = w[5]
+    out[5] = (force_cargo_normal*np.sin(w[0]) + force_wind - force_friction)/SHIP_MASS
+    out[6] = w[7]
+    out[7] = -GRAV_ACC * np.sin(w[0])
+
+
+@njit(error_model="numpy")
+def derivativeCargoWindKernel(t, w, p, out):
+    """Compiled derivativeCargoWind, writes [d theta, d omega, d y_C, d v_yC, d x_C, d v_xC, d s_L, d v_L] into out
+    """
+    gamma = _gamma(w, p)
+    area_water = 0.5*SHIP_RADIUS**2 * (gamma - np.sin(gamma))
+    force_buoy = GRAV_ACC*WATER_DENSITY*area_water  # [N] buoyancy force
+    force_grav = GRAV_ACC*SHIP_MASS
+    force_cargo_normal = GRAV_ACC*p.cargo_mass*np.cos(w[0])
+    force_cargo_friction = np.sign(w[7]) * p.mu*force_cargo_normal
+
+    force_wind = p.force_wind0*np.cos(p.omega_omega * t)
+    force_friction = p.k_f * SHIP_RADIUS * gamma * w[1]
+
+    out[0] = w[1]
+    out[1] = (-force_buoy*DISTANCE_MC*np.sin(w[0]) - force_cargo_normal*w[6] + force_wind*w[2] - force_friction * (w[2] + SHIP_RADIUS*(1 - np.cos(gamma/2))) + force_cargo_friction*DISTANCE_MC)/SHIP_INERTIA
+    out[2] = w[3]
+    out[3] = (force_buoy - force_grav - force_cargo_normal*np.cos(w[0]) - force_cargo_friction*np.sin(w[0]))/SHIP_MASS
+    out[4] = w[5]
+    out[5] = (force_cargo_normal*np.sin(w[0]) + force_wind - force_friction + force_cargo_friction*np.cos(w[0]))/SHIP_MASS
+    out[6] = w[7]
+    out[7] = -GRAV_ACC * np.sin(w[0]) - force_cargo_friction/p.cargo_mass
+
+
+@njit
+def isCapsizedKernel(theta, yC):
+    """Compiled isCapsized
+    """
+    yM = yC + DISTANCE_MC * np.cos(theta)
+    return yM - SHIP_RADIUS*np.abs(np.sin(theta)) < 0
+
+
+@njit
+def RK4StepKernel(derivative, wn, t_i, dt, p, out, k1, k2, k3, k4, tmp):
+    """Compiled RK4Step, writes the next state into out using the given work arrays
+    """
+    n = len(wn)
+    derivative(t_i, wn, p, k1)
+    for j in range(n):
+        tmp[j] = wn[j] + dt*k1[j]*0.5
+    derivative(t_i + dt*0.5, tmp, p, k2)
+    for j in range(n):
+        tmp[j] = wn[j] + dt*k2[j]*0.5
+    derivative(t_i + dt*0.5, tmp, p, k3)
+    for j in range(n):
+        tmp[j] = wn[j] + dt*k3[j]
+    derivative(t_i + dt, tmp, p, k4)
+    for j in range(n):
+        out[j] = wn[j] + dt/6 * (k1[j] + 2*k2[j] + 2*k3[j] + k4[j])
+
+
+@njit
+def _rk4_loop(derivative, w_array, t, dt, p, capsize, railing, falling, p_off):
+    """Compiled stepping loop shared by the integrators below
+
+    Returns:
+        tuple[bool, int]: whether the ship capsized, and the index the cargo fell off on (-1 if still on)
+    """
+    n, num_points = w_array.shape
+    k1, k2, k3, k4 = np.empty(n), np.empty(n), np.empty(n), np.empty(n)
+    tmp, wn = np.empty(n), np.empty(n)
+    capsized = False
+    box_off_index = -1
+
+    for i in range(num_points - 1):
+        RK4StepKernel(derivative, w_array[:, i], t[i], dt, p, wn, k1, k2, k3, k4, tmp)
+        if railing and abs(wn[6]) > SHIP_RADIUS:
+            wn[6] = SHIP_RADIUS*np.sign(wn[6])
+            wn[7] = 0
+        if falling and box_off_index == -1 and abs(wn[6]) > SHIP_RADIUS:
+            box_off_index = i
+            p = p_off
+        if capsize and isCapsizedKernel(wn[0], wn[2]):
+            w_array[0, i+1:] = np.sign(w_array[0, i])*np.pi*0.5
+            capsized = True
+            break
+        w_array[:, i+1] = wn
+
+    return capsized, box_off_index
+
+
+def _run(derivative, b0, ta, tb, dt, p, *, capsize=False, railing=False, falling=False, p_off=None):
+    num_iter = int((tb-ta)/dt)
+    t, dt = np.linspace(ta, tb, num_iter + 1, retstep=True)
+    w_array = np.zeros((len(b0), num_iter + 1))
+    w_array[:, 0] = b0
+    capsized, box_off_index = _rk4_loop(derivative, w_array, t, dt, p, capsize, railing, falling,
+                                        p if p_off is None else p_off)
+    return t, w_array, dt, capsized, box_off_index
+
+
+def RK4Jit(derivative, b0, ta, tb, dt, *, retstep=False, **fkwargs):
+    """Compiled RK4
+
+    Args:
+        derivative (numba dispatcher): Derivative kernel, e.g. derivative_torque_calc_area_kernel
+        b0 (np.ndarray): initial state of the system
+        ta (float): start time
+        tb (float): end time
+        dt (float): approximate size of the time step
+        retstep (bool, optional): If True, return (t, w_array, step), where step is the spacing between samples. Defaults to False.
+        fkwargs: parameters passed to make_params
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: array of times, and the corresponding evaluated system states
+    """
+    t, w_array, dt, capsized, box_off_index = _run(derivative, b0, ta, tb, dt, make_params(**fkwargs))
+    if retstep:
+        return t, w_array, dt
+    return t, w_array
+
+
+def RK4CapsizedJit(derivative, b0, ta, tb, dt, *, retstep=False, **fkwargs):
+    """Compiled RK4Capsized
+
+    Args:
+        derivative (numba dispatcher): Derivative kernel, e.g. derivative_torque_calc_area_kernel
+        b0 (np.ndarray): initial state of the system
+        ta (float): start time
+        tb (float): end time
+        dt (float): approximate size of the time step
+        retstep (bool, optional): If True, return (t, w_array, capsized, step), where step is the spacing between samples. Defaults to False.
+        fkwargs: parameters passed to make_params
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, bool]: array of times, the corresponding evaluated system states, and whether the ship capsized
+    """
+    t, w_array, dt, capsized, box_off_index = _run(derivative, b0, ta, tb, dt, make_params(**fkwargs), capsize=True)
+    if retstep:
+        return t, w_array, capsized, dt
+    return t, w_array, capsized
+
+
+def RK4FallingCargoJit(derivative, b0, ta, tb, dt, *, retstep=False, **fkwargs):
+    """Compiled RK4FallingCargo
+
+    Args:
+        derivative (numba dispatcher): Derivative kernel, e.g. derivative_cargo_kernel
+        b0 (np.ndarray): initial state of the system
+        ta (float): start time
+        tb (float): end time
+        dt (float): approximate size of the time step
+        retstep (bool, optional): If True, return (t, w_array, box_fall, step), where step is the spacing between samples. Defaults to False.
+        fkwargs: parameters passed to make_params, must contain 'cargo_mass'
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, int]: array of times, the corresponding evaluated system states and the index the box falls off on (-1 if still on)
+    """
+    beta, err = calculate_beta(fkwargs['cargo_mass'])
+    p = make_params(**fkwargs, beta=beta)
+    p_off = make_params(**{**fkwargs, 'cargo_mass': 0})
+    t, w_array, dt, capsized, box_off_index = _run(derivative, b0, ta, tb, dt, p, capsize=True, falling=True, p_off=p_off)
+    if retstep:
+        return t, w_array, box_off_index, dt
+    return t, w_array, box_off_index
+
+
+def RK4RailingJit(derivative, b0, ta, tb, dt, *, retstep=False, stats=None, **fkwargs):
+    """Compiled RK4Railing
+
+    Args:
+        derivative (numba dispatcher): Derivative kernel, e.g. derivative_wind_friction_kernel
+        b0 (np.ndarray): initial state of the system
+        ta (float): start time
+        tb (float): end time
+        dt (float): approximate size of the time step
+        retstep (bool, optional): If True, return (t, w_array, step), where step is the spacing between samples. Defaults to False.
+        stats (dict, optional): If given, whether the ship 'capsized' is stored in it. Defaults to None.
+        fkwargs: parameters passed to make_params, must contain 'cargo_mass'
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: array of times, and the corresponding evaluated system states
+    """
+    beta, err = calculate_beta(fkwargs['cargo_mass'])
+    t, w_array, dt, capsized, box_off_index = _run(derivative, b0, ta, tb, dt, make_params(**fkwargs, beta=beta),
+                                                   capsize=True, railing=True)
+    if stats is not None:
+        stats.update(capsized=capsized)
+    if retstep:
+        return t, w_array, dt
+    return t, w_array
+
+
+def RK4RailingStream(derivative, b0, ta, tb, dt, *, chunk_size=1000, railing=True, **fkwargs):
+    """RK4RailingJit as a generator, which yields the trajectory a chunk at a time while it is computed
+
+    Only one chunk is held in memory, so runs of any length can be watched or written to a
+    TrajectoryStore while they are computed. The time steps are the same as for RK4RailingJit, but
+    the trajectory ends when the ship capsizes, instead of being filled with theta = ±pi/2.
+
+    Args:
+        derivative (numba dispatcher): Derivative kernel, e.g. derivative_wind_friction_kernel
+        b0 (np.ndarray): initial state of the system
+        ta (float): start time
+        tb (float): end time
+        dt (float): approximate size of the time step
+        chunk_size (int, optional): number of time steps per chunk. Defaults to 1000.
+        railing (bool, optional): Hold the cargo on the ship with railings. Defaults to True.
+        fkwargs: parameters passed to make_params
+
+    Yields:
+        tuple[np.ndarray, np.ndarray]: times and the corresponding system states of each chunk, the first starting with b0
+    """
+    beta, err = calculate_beta(fkwargs.get('cargo_mass', 0))
+    p = make_params(**fkwargs, beta=beta)
+    num_iter = int((tb-ta)/dt)
+    w_array = np.zeros((len(b0), chunk_size + 1))
+    w_array[:, 0] = b0
+    yield np.array([ta], dtype=float), w_array[:, :1].copy()
+    if num_iter == 0:
+        return  # tb - ta < dt, so like RK4RailingJit the trajectory is only b0
+    dt = (tb - ta)/num_iter
+
+    for start in range(0, num_iter, chunk_size):
+        n = min(chunk_size, num_iter - start)
+        t = ta + dt*np.arange(start, start + n + 1)
+        w_array[2, 1:] = np.nan  # marks the steps that are not reached if the ship capsizes
+        capsized, box_off_index = _rk4_loop(derivative, w_array[:, :n + 1], t, dt, p, True, railing, False, p)
+        if capsized:
+            n = np.argmax(np.isnan(w_array[2, 1:n + 1]))
+            yield t[1:n + 1], w_array[:, 1:n + 1].copy()
+            return
+        yield t[1:], w_array[:, 1:n + 1].copy()
+        w_array[:, 0] = w_array[:, n]
+
+
+if __name__ == "__main__":
+    import time
+    from ShipModel import RK4Railing, derivative_wind_friction, RESONANCE_FREQUENCY
+
+    cargo_mass = 0.02*SHIP_MASS
+    fkwargs = dict(cargo_mass=cargo_mass, k_f=100, force_wind0=0.625*SHIP_MASS*GRAV_ACC,
+                   omega_omega=0.93*RESONANCE_FREQUENCY)
+    beta, err = calculate_beta(cargo_mass)
+    b0 = np.array([0, 0.2, SHIP_RADIUS*np.cos(beta/2) - DISTANCE_MC, 0, 0, 0, 3, 0])
+    ta, tb, dt = 0, 20, 0.001
+
+    RK4RailingJit(derivative_wind_friction_kernel, b0, ta, tb, dt, **fkwargs)  # compile
+
+    start = time.perf_counter()
+    t, w_ref = RK4Railing(derivative_wind_friction, b0, ta, tb, dt, **fkwargs)
+    time_ref = time.perf_counter() - start
+
+    start = time.perf_counter()
+    t, w_jit = RK4RailingJit(derivative_wind_friction_kernel, b0, ta, tb, dt, **fkwargs)
+    time_jit = time.perf_counter() - start
+
+    print(f"RK4Railing:    {len(t)/time_ref:12.0f} steps per second")
+    print(f"RK4RailingJit: {len(t)/time_jit:12.0f} steps per second")
+    print(f"Largest difference between the trajectories: {np.max(np.abs(w_ref - w_jit))}")
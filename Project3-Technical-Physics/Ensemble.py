@@ -0,0 +1,326 @@
+"""Ensemble version of the RK4 integrators from Project-Code.ipynb.
+
+The state is an array of shape (n_state, K) holding K independent scenarios, one per
+column. Every model parameter ('cargo_mass', 'k_f', 'mu', 'force_wind0', 'omega_omega')
+may be given either as a scalar or as an array of length K, so sweeps over initial
+conditions and parameters are integrated together in one vectorized run instead of
+one Python loop per configuration.
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from ShipModel import (SHIP_RADIUS, SHIP_MASS, SHIP_INERTIA, DISTANCE_MC, GRAV_ACC, WATER_DENSITY,
+                       RESONANCE_FREQUENCY, BETA, calculate_beta, isCapsized)
+
+
+def _submerged(w, beta):
+    """Calculates the sector angle and buoyancy force for every member of the ensemble
+
+    Args:
+        w (np.ndarray): states of shape (n_state, K), with theta in row 0 and y_C in row 2
+        beta (np.ndarray): equilibrium sector angle of each member, shape (K,)
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: the sector angle gamma, and the buoyancy force
+    """
+    cos_half_beta = np.cos(beta*0.5)
+    y_C_0 = SHIP_RADIUS*cos_half_beta - DISTANCE_MC
+    delta_Yc = w[2] - y_C_0
+    gamma = 2*np.arccos(cos_half_beta - (4/(3*np.pi)) * (1 - np.cos(w[0])) + delta_Yc/SHIP_RADIUS)
+    area_water = 0.5*SHIP_RADIUS**2 * (gamma - np.sin(gamma))
+    return gamma, GRAV_ACC*WATER_DENSITY*area_water
+
+
+def derivative_torque_calc_area_ensemble(t, w, *, beta, **kwargs):
+    """Ensemble version of derivative_torque_calc_area
+
+    Args:
+        t (float): time
+        w (np.ndarray): states of shape (6, K), rows [theta, omega, y_C, v_yC, x_C, v_xC]
+        beta (np.ndarray): equilibrium sector angle of each member
+
+    Returns:
+        np.ndarray: derivative of shape (6, K)
+    """
+    gamma, force_buoy = _submerged(w, beta)
+    force_grav = SHIP_MASS*GRAV_ACC
+
+    dw = np.empty_like(w)
+    dw[0] = w[1]
+    dw[1] = -force_buoy*DISTANCE_MC*np.sin(w[0]) / SHIP_INERTIA
+    dw[2] = w[3]
+    dw[3] = (force_buoy - force_grav)/SHIP_MASS
+    dw[4] = w[5]
+    dw[5] = 0
+    return dw
+
+
+def derivative_cargo_ensemble(t, w, *, cargo_mass, beta, **kwargs):
+    """Ensemble version of derivative_cargo
+
+    Args:
+        t (float): time
+        w (np.ndarray): states of shape (8, K), rows [theta, omega, y_C, v_yC, x_C, v_xC, s_L, v_L]
+        cargo_mass (np.ndarray): cargo mass of each member
+        beta (np.ndarray): equilibrium sector angle of each member
+
+    Returns:
+        np.ndarray: derivative of shape (8, K)
+    """
+    gamma, force_buoy = _submerged(w, beta)
+    force_grav = GRAV_ACC*SHIP_MASS
+    sin_theta, cos_theta = np.sin(w[0]), np.cos(w[0])
+    force_cargo_normal = GRAV_ACC*cargo_mass*cos_theta
+
+    dw = np.empty_like(w)
+    dw[0] = w[1]
+    dw[1] = (-force_buoy*DISTANCE_MC*sin_theta - force_cargo_normal*w[6])/SHIP_INERTIA
+    dw[2] = w[3]
+    dw[3] = (force_buoy - force_grav - force_cargo_normal*cos_theta)/SHIP_MASS
+    dw[4] = w[5]
+    dw[5] = force_cargo_normal*sin_theta/SHIP_MASS
+    dw[6] = w[7]
+    dw[7] = -GRAV_ACC * sin_theta
+    return dw
+
+
+def derivative_wind_friction_ensemble(t, w, *, cargo_mass, k_f, force_wind0, omega_omega, beta, **kwargs):
+    """Ensemble version of derivative_wind_friction
+
+    Args:
+        t (float): time
+        w (np.ndarray): states of shape (8, K), rows [theta, omega, y_C, v_yC, x_C, v_xC, s_L, v_L]
+        cargo_mass, k_f, force_wind0, omega_omega (np.ndarray): parameters of each member
+        beta (np.ndarray): equilibrium sector angle of each member
+
+    Returns:
+        np.ndarray: derivative of shape (8, K)
+    """
+    gamma, force_buoy = _submerged(w, beta)
+    force_grav = GRAV_ACC*SHIP_MASS
+    sin_theta, cos_theta = np.sin(w[0]), np.cos(w[0])
+    force_cargo_normal = GRAV_ACC*cargo_mass*cos_theta
+
+    force_wind = force_wind0*np.cos(omega_omega * t)
+    force_friction = k_f * SHIP_RADIUS * gamma * w[1]
+
+    dw = np.empty_like(w)
+    dw[0] = w[1]
+    dw[1] = (-force_buoy*DISTANCE_MC*sin_theta - force_cargo_normal*w[6] + force_wind*w[2]
+             - force_friction * (w[2] + SHIP_RADIUS*(1 - np.cos(gamma/2)))) / SHIP_INERTIA
+    dw[2] = w[3]
+    dw[3] = (force_buoy - force_grav - force_cargo_normal*cos_theta)/SHIP_MASS
+    dw[4] = w[5]
+    dw[5] = (force_cargo_normal*sin_theta + force_wind - force_friction)/SHIP_MASS
+    dw[6] = w[7]
+    dw[7] = -GRAV_ACC * sin_theta
+    return dw
+
+
+def derivativeCargoWindEnsemble(t, w, *, cargo_mass, k_f, force_wind0, omega_omega, mu, beta, **kwargs):
+    """Ensemble version of derivativeCargoWind
+
+    Args:
+        t (float): time
+        w (np.ndarray): states of shape (8, K), rows [theta, omega, y_C, v_yC, x_C, v_xC, s_L, v_L]
+        cargo_mass, k_f, force_wind0, omega_omega, mu (np.ndarray): parameters of each member
+        beta (np.ndarray): equilibrium sector angle of each member
+
+    Returns:
+        np.ndarray: derivative of shape (8, K)
+    """
+    gamma, force_buoy = _submerged(w, beta)
+    force_grav = GRAV_ACC*SHIP_MASS
+    sin_theta, cos_theta = np.sin(w[0]), np.cos(w[0])
+    force_cargo_normal = GRAV_ACC*cargo_mass*cos_theta
+    force_cargo_friction = np.sign(w[7]) * mu*force_cargo_normal
+
+    force_wind = force_wind0*np.cos(omega_omega * t)
+    force_friction = k_f * SHIP_RADIUS * gamma * w[1]
+
+    dw = np.empty_like(w)
+    dw[0] = w[1]
+    dw[1] = (-force_buoy*DISTANCE_MC*sin_theta - force_cargo_normal*w[6] + force_wind*w[2]
+             - force_friction * (w[2] + SHIP_RADIUS*(1 - np.cos(gamma/2))) + force_cargo_friction*DISTANCE_MC)/SHIP_INERTIA
+    dw[2] = w[3]
+    dw[3] = (force_buoy - force_grav - force_cargo_normal*cos_theta - force_cargo_friction*sin_theta)/SHIP_MASS
+    dw[4] = w[5]
+    dw[5] = (force_cargo_normal*sin_theta + force_wind - force_friction + force_cargo_friction*cos_theta)/SHIP_MASS
+    dw[6] = w[7]
+    dw[7] = -GRAV_ACC * sin_theta - force_cargo_friction/cargo_mass
+    return dw
+
+
+def equilibrium_states(cargo_mass=0, theta_0=0, omega_0=0, s_L_0=3, n_state=8):
+    """Builds the initial states of an ensemble, with every ship floating at its equilibrium height
+
+    Args:
+        cargo_mass (ArrayLike, optional): cargo mass of each member. Defaults to 0.
+        theta_0 (ArrayLike, optional): initial angle of each member. Defaults to 0.
+        omega_0 (ArrayLike, optional): initial angular velocity of each member. Defaults to 0.
+        s_L_0 (ArrayLike, optional): initial cargo position of each member. Defaults to 3.
+        n_state (int, optional): 6 for a ship without cargo, 8 with cargo. Defaults to 8.
+
+    Returns:
+        np.ndarray: initial states of shape (n_state, K)
+    """
+    cargo_mass, theta_0, omega_0, s_L_0 = np.broadcast_arrays(*map(np.atleast_1d, (cargo_mass, theta_0, omega_0, s_L_0)))
+    beta, err = calculate_beta(cargo_mass.astype(float))
+    b0 = np.zeros((n_state, len(cargo_mass)))
+    b0[0] = theta_0
+    b0[1] = omega_0
+    b0[2] = SHIP_RADIUS*np.cos(beta/2) - DISTANCE_MC
+    if n_state > 6:
+        b0[6] = s_L_0
+    return b0
+
+
+def RK4StepEnsemble(derivative, wn, t_i, dt, params):
+    """Runs one step of the Runge-Kutta method of the 4th order for every member of the ensemble
+
+    Args:
+        derivative (callable(float, np.ndarray, **params)->np.ndarray): Ensemble derivative function
+        wn (np.ndarray): current states of shape (n_state, K)
+        t_i (float): current time
+        dt (float): size of the time-step
+        params (dict): parameter arrays of the members in wn
+
+    Returns:
+        np.ndarray: the next states of shape (n_state, K)
+    """
+    k1 = derivative(t_i, wn, **params)
+    k2 = derivative(t_i + dt*0.5, wn + dt*k1*0.5, **params)
+    k3 = derivative(t_i + dt*0.5, wn + dt*k2*0.5, **params)
+    k4 = derivative(t_i + dt, wn + dt*k3, **params)
+
+    return wn + dt/6 * (k1 + 2*k2 + 2*k3 + k4)
+
+
+def RK4Ensemble(derivative, b0, ta, tb, dt, *, railing=False, falling=False, capsize=True, retstep=False, **fkwargs):
+    """Runs the Runge-Kutta method of the 4th order on an ensemble of K scenarios at once
+
+    Combines the behaviour of RK4, RK4Capsized, RK4FallingCargo and RK4Railing, applied per member:
+
+    - If a member capsizes, the rest of its time-steps are filled with a capsized state, and it is
+      removed from the active set so it costs nothing for the remainder of the run
+    - With railing=True, cargo that would fall off is stopped at the edge of the ship
+    - With falling=True, cargo that falls off has its mass set to 0 for the remainder of the run
+
+    Args:
+        derivative (callable(float, np.ndarray, **kwargs)->np.ndarray): Ensemble derivative function
+        b0 (np.ndarray): initial states, shape (n_state, K) or (n_state,) if shared by all members
+        ta (float): start time
+        tb (float): end time
+        dt (float): approximate size of the time step
+        railing (bool, optional): Hold the cargo on the ship with railings. Defaults to False.
+        falling (bool, optional): Let the cargo fall off the ship. Defaults to False.
+        capsize (bool, optional): Check for capsizing. Defaults to True.
+        retstep (bool, optional): If True, also return the spacing between samples. Defaults to False.
+        fkwargs: scalar or length K parameters passed to the derivative. If 'cargo_mass' is given,
+            each member's 'beta' is calculated from it
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: array of times, the evaluated states of
+        shape (n_state, K, len(t)), whether each member capsized, and the index each member's cargo
+        falls off on (-1 if still on)
+    """
+    if railing and falling:
+        raise ValueError("The cargo can not both be held by railings and fall off")
+
+    b0 = np.asarray(b0, dtype=float)
+    if b0.ndim == 1:
+        b0 = b0[:, None]
+    K = np.broadcast_shapes(b0.shape[1:], *(np.shape(v) for v in fkwargs.values()))[0]
+    b0 = np.broadcast_to(b0, (len(b0), K))
+    params = {key: np.broadcast_to(np.asarray(value, dtype=float), (K,)).copy() for key, value in fkwargs.items()}
+    if 'cargo_mass' in params:
+        params['beta'], err = calculate_beta(params['cargo_mass'])
+    else:
+        params.setdefault('beta', np.full(K, BETA))
+
+    num_iter = int((tb-ta)/dt)
+    t, dt = np.linspace(ta, tb, num_iter + 1, retstep=True)
+    w_array = np.zeros((len(b0), K, num_iter + 1))
+    w_array[:, :, 0] = b0
+    capsized = np.zeros(K, dtype=bool)
+    box_off_index = np.full(K, -1)
+
+    # Indices of the members still being integrated, and their parameters
+    active = np.arange(K)
+    active_params = params
+    wn = w_array[:, :, 0]
+
+    for i in range(num_iter):
+        wn = RK4StepEnsemble(derivative, wn, t[i], dt, active_params)
+        if railing:
+            off = np.abs(wn[6]) > SHIP_RADIUS
+            wn[6] = np.where(off, SHIP_RADIUS*np.sign(wn[6]), wn[6])
+            wn[7] = np.where(off, 0, wn[7])
+        if falling:
+            off = (box_off_index[active] == -1) & (np.abs(wn[6]) > SHIP_RADIUS)
+            if off.any():
+                box_off_index[active[off]] = i
+                active_params['beta'][off] = BETA
+                active_params['cargo_mass'][off] = 0
+        if capsize:
+            cap = isCapsized(wn[0], wn[2])
+            if cap.any():
+                members = active[cap]
+                capsized[members] = True
+                w_array[0, members, i+1:] = (np.sign(w_array[0, members, i])*np.pi*0.5)[:, None]
+                active = active[~cap]
+                active_params = {key: value[~cap] for key, value in active_params.items()}
+                wn = wn[:, ~cap]
+                if len(active) == 0:
+                    break
+        w_array[:, active, i+1] = wn
+
+    # Returning results
+    if retstep:
+        return t, w_array, capsized, box_off_index, dt
+    return t, w_array, capsized, box_off_index
+
+
+def testFrictionEnsemble():
+    """Integrates the friction study of the notebook (testFriction) as one ensemble, and plots the result
+    """
+    ta, tb, dt = 0, 20, 0.005
+    k_f = np.array([20_000, 14_000, 10_000, 6_000, 1_000])
+    b0 = equilibrium_states(cargo_mass=0, omega_0=0.2)
+    t, result, capsized, box_fall = RK4Ensemble(derivative_wind_friction_ensemble, b0, ta, tb, dt, railing=True,
+                                                cargo_mass=0, k_f=k_f, force_wind0=0, omega_omega=0)
+
+    plt.figure(figsize=(6, 6))
+    for j in range(len(k_f)):
+        plt.plot(t, np.rad2deg(result[0, j]), label=f"k_f={k_f[j]}")
+    plt.title("Angular displacement for different friction coefficients", fontsize=14)
+    plt.xlabel('Time [s]', fontsize=12)
+    plt.ylabel('$\\theta$ [deg]', fontsize=12)
+    plt.legend()
+    plt.grid(True)
+    plt.show()
+
+
+def testOmegaEnsemble():
+    """Integrates a sweep over the wind frequency around the resonance frequency as one ensemble
+    """
+    ta, tb, dt = 0, 60, 0.005
+    omega_omega = np.linspace(0.8, 1.2, 41)*RESONANCE_FREQUENCY
+    b0 = equilibrium_states(cargo_mass=0, omega_0=np.deg2rad(2))
+    t, result, capsized, box_fall = RK4Ensemble(derivative_wind_friction_ensemble, b0, ta, tb, dt, railing=True,
+                                                cargo_mass=0, k_f=100, force_wind0=0.1*SHIP_MASS*GRAV_ACC,
+                                                omega_omega=omega_omega)
+
+    plt.figure(figsize=(6, 6))
+    plt.plot(omega_omega/RESONANCE_FREQUENCY, np.rad2deg(np.max(np.abs(result[0]), axis=1)), "o-")
+    plt.title("Largest angular displacement", fontsize=14)
+    plt.xlabel('$\\omega_\\omega / \\omega_0$', fontsize=12)
+    plt.ylabel('max $|\\theta|$ [deg]', fontsize=12)
+    plt.grid(True)
+    plt.show()
+
+
+if __name__ == "__main__":
+    testFrictionEnsemble()
+    testOmegaEnsemble()
@@ -0,0 +1,588 @@
+"""Importable copy of the ship model from Project-Code.ipynb.
+
+The constants, derivative functions and RK4 integrators below are taken unchanged
+from the notebook, so that the solvers and tools in this folder can be compared
+against (and benchmarked with) the exact code used in the report.
+"""
+
+import numpy as np
+from operator import itemgetter
+
+
+WATER_DENSITY = 1000  # [kg/m²] Water density
+SHIP_DENSITY = 500  # [kg/m²] Density of the ship
+SHIP_RADIUS = 10  # [m] the cross section of the ship is a semicircle, with radius SHIP_RADIUS
+SHIP_AREA = 0.5*np.pi*(SHIP_RADIUS)**2  # [m²] area of semicircle
+SHIP_MASS = SHIP_AREA*SHIP_DENSITY  # [kg] the mass of the ship
+SHIP_INERTIA = 0.5*SHIP_MASS*(SHIP_RADIUS)**2*(1 - 32/(9*np.pi**2))  # [kgm²] The ship's moment of inertia
+
+A_0 = (0.5*SHIP_DENSITY*np.pi*(SHIP_RADIUS)**2)/(WATER_DENSITY) # [m²] Area of ship submerged under water
+
+DISTANCE_MC = 4*SHIP_RADIUS/(3*np.pi)  # [m] distance from the ship's metacenter to the ship's mass center
+GRAV_ACC = 9.81  # [m/s²] acceleration due to gravity
+RESONANCE_FREQUENCY = np.sqrt(SHIP_MASS * DISTANCE_MC * GRAV_ACC/SHIP_INERTIA)  # Resonance frequency of the ship
+
+
+def newton_method(f, fPrime, x0, L, tol=1e-14, maxIter=30):
+    """Implementation of newtons method, which considers an 
+    upper error estimate
+
+
+    Args:
+        f (function): f(x) = 0
+        fPrime (function): f'(x)
+        x0 (ArrayLike): initial guess at root
+        L (float): used to determine upper errorbound
+        tol (float, optional): maximum allowed error. Defaults to 1e-14.
+        maxIter (int, optional): maximum number of iterations. Defaults to 30.
+
+    Returns:
+        tuple[ArrayLike, float]: root of the function and error estimate
+    """
+    err = float("inf")
+    x1 = x0
+    for _ in range(maxIter):
+        x1 = x0 - f(x0)/fPrime(x0)
+        err = np.linalg.norm(L/(L-1)*(x1-x0))
+        if err < tol:
+            break
+        x0 = x1
+    else:
+        print("Warning: Maximum iterations reached")
+    return x1, err
+
+
+def calculate_beta(cargo_mass=0):
+    """Calculates the central angle of the ship at equilibrium with the given total cargo mass
+
+    Args:
+        cargo_mass (int, optional): mass of the cargo. Defaults to 0.
+    
+    Returns:
+        tuple[float, float]: The central angle, and the error estimate
+    """
+    def f(x):
+        return x - np.sin(x) - np.pi*(SHIP_DENSITY + cargo_mass/SHIP_AREA)/WATER_DENSITY
+
+    def fPrime(x):
+        return 1 - np.cos(x)
+
+    b0 = 1
+    L = 2
+    beta, err = newton_method(f, fPrime, b0, L)
+    return beta, err
+
+
+BETA, error = calculate_beta()
+
+Y_MB_0 = 4*SHIP_RADIUS*(np.sin(BETA/2))**3/(3*(BETA - np.sin(BETA)))
+Y_M_0 = SHIP_RADIUS*np.cos(BETA/2)
+Y_C_0 = Y_M_0 - DISTANCE_MC
+Y_B_0 = Y_M_0 - Y_MB_0
+Y_D_0 = Y_M_0 - SHIP_RADIUS
+
+
+def RK4Step(derivative, wn, t_i, dt, **kwargs):
+    """Runs one step of the Runge-Kutta method of the 4th other
+
+    Args:
+        derivative (callable(float, np.ndarray, **kwargs)->np.ndarray): Derivative function, returns array of derivative of each element in the input array
+        wn (np.ndarray): current state of the system
+        t_i (float): current time
+        dt (float): size of the time-step
+
+    Returns:
+        np.ndarray: the next state of the system
+    """
+    k1 = derivative(t_i, wn, **kwargs)
+    k2 = derivative(t_i + dt*0.5, wn + dt*k1*0.5, **kwargs)
+    k3 = derivative(t_i + dt*0.5, wn + dt*k2*0.5, **kwargs)
+    k4 = derivative(t_i + dt, wn + dt*k3, **kwargs)
+
+    return wn + dt/6 * (k1 + 2*k2 + 2*k3 + k4)
+
+
+def RK4(derivative, b0, ta, tb, dt, *, retstep=False, **fkwargs):
+    """Runs the Runge-Kutta of method the 4th order on the given input
+
+    Args:
+        derivative (callable(float, np.ndarray, **kwargs)->np.ndarray): Derivative function, returns array of derivative of each element in the input array
+        b0 (np.ndarray): initial state of the system
+        ta (float): start time
+        tb (float): end time
+        dt (float): approximate size of the time step
+        retstep (bool, optional): If True, return (t, w_array, step), where step is the spacing between samples. Defaults to False.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: array of times, and the corresponding evaluated system states
+    """
+
+    num_iter = int((tb-ta)/dt)
+    t, dt = np.linspace(ta, tb, num_iter + 1, retstep=True)
+    w_array = np.zeros((len(b0), num_iter + 1))
+    w_array[:, 0] = b0
+    
+    for i in range(num_iter):
+        w_array[:, i+1] = RK4Step(derivative, w_array[:, i], t[i], dt, **fkwargs)
+
+    # Returning results
+    if retstep:
+        return t, w_array, dt
+    return t, w_array
+
+
+def derivative_torque_calc_area(t, w):
+    """Calculates the derivative of w, considering: 
+    
+    - The buoyance force
+    - The gravitational force
+
+    Args:
+        t (float): time
+        w (np.ndarray): vector of form [theta, omega, y_C, v_yC, x_C, v_xC]
+
+    Returns:
+        np.ndarray: derivative of form [d theta, d omega, d y_C, d v_yC, d x_C, d v_xC]
+    """
+    delta_Yc = w[2] - Y_C_0
+    gamma = 2*np.arccos(np.cos(BETA*0.5) - (4/(3*np.pi)) * (1 - np.cos(w[0])) + delta_Yc/SHIP_RADIUS)
+    area_water = 0.5*SHIP_RADIUS**2 * (gamma - np.sin(gamma))
+    force_buoy = GRAV_ACC*WATER_DENSITY*area_water  # [N] buoyancy force
+    force_grav = SHIP_MASS*GRAV_ACC
+    return np.array([w[1],
+                    -force_buoy*DISTANCE_MC*np.sin(w[0]) / SHIP_INERTIA,
+                    w[3],
+                    (force_buoy - force_grav)/SHIP_MASS,
+                    w[5],
+                    0])
+
+
+def isCapsized(theta, yC):
+    """Returns whether the given rotation angle and height of mass center implies the ship is capsized
+
+    Args:
+        theta (float): angle of rotation around center of mass
+        yC (float): height of center of mass
+
+    Returns:
+        bool: True if the ship is capsized
+    """
+    yM = yC + DISTANCE_MC * np.cos(theta)
+    return yM - SHIP_RADIUS*np.abs(np.sin(theta)) < 0
+
+
+def RK4Capsized(derivative, b0, ta, tb, dt, *, retstep=False, stats=None, **fkwargs):
+    """Runs the Runge-Kutta of method the 4th order on the given input, with a check for capsizing
+
+    If the ship capsizes, the rest of the time-steps are filled with a capsized state
+
+    Args:
+        derivative (callable(float, np.ndarray, **kwargs)->np.ndarray): Derivative function, returns array of derivative of each element in the input array
+        b0 (np.ndarray): initial state of the system
+        ta (float): start time
+        tb (float): end time
+        dt (float): approximate size of the time step
+        retstep (bool, optional): If True, return (t, w_array, capsized, step), where step is the spacing between samples. Defaults to False.
+        stats (dict, optional): If given, the number of 'steps', evaluations of derivative 'nfev' and whether the ship 'capsized' are stored in it. Defaults to None.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, bool]: array of times, the corresponding evaluated system states, and whether the ship capsized
+    """
+
+    num_iter = int((tb-ta)/dt)
+    t, dt = np.linspace(ta, tb, num_iter + 1, retstep=True)
+    w_array = np.zeros((len(b0), num_iter + 1))
+    w_array[:, 0] = b0
+    capsized = False
+
+    for i in range(num_iter):
+        wn = RK4Step(derivative, w_array[:, i], t[i], dt, **fkwargs)
+        if isCapsized(wn[0], wn[2]):
+            w_array[0, i+1:] = np.sign(w_array[0, i])*np.pi*0.5
+            capsized = True
+            break
+        w_array[:, i+1] = wn
+
+    if stats is not None:
+        steps = i + 1 if num_iter else 0
+        stats.update(steps=steps, nfev=4*steps, capsized=capsized)
+
+    # Returning results
+    if retstep:
+        return t, w_array, capsized, dt
+    return t, w_array, capsized
+
+
+def derivative_cargo(t, w, **kwargs):
+    """Calculates the derivative of w, considering: 
+    
+    - The buoyance force
+    - The gravitational force
+    - The dynamics of the cargo
+
+    Args:
+        t (float): time
+        w (np.ndarray): vector of form [theta, omega, y_C, v_yC, x_C, v_xC, s_L, v_L]
+        kwargs ("dict"): Must contain: 'cargo_mass'
+
+    Returns:
+        np.ndarray: derivative of form [d theta, d omega, d y_C, d v_yC, d x_C, d v_xC, d s_L, d v_L]
+    """
+    cargo_mass = kwargs['cargo_mass']
+    beta = kwargs.get('beta', BETA)
+
+    y_M_0 = SHIP_RADIUS*np.cos(beta/2)
+    y_C_0 = y_M_0 - DISTANCE_MC
+    delta_Yc = w[2] - y_C_0
+    gamma = 2*np.arccos(np.cos(beta*0.5) - (4/(3*np.pi)) * (1 - np.cos(w[0])) + delta_Yc/SHIP_RADIUS)
+    area_water = 0.5*SHIP_RADIUS**2 * (gamma - np.sin(gamma))
+    force_buoy = GRAV_ACC*WATER_DENSITY*area_water  # [N] buoyancy force
+    force_grav = GRAV_ACC*SHIP_MASS
+    force_cargo_normal = GRAV_ACC*cargo_mass*np.cos(w[0])
+    
+    return np.array([w[1],
+                    (-force_buoy*DISTANCE_MC*np.sin(w[0]) - force_cargo_normal*w[6])/SHIP_INERTIA,
+                    w[3],
+                    (force_buoy - force_grav - force_cargo_normal*np.cos(w[0]))/SHIP_MASS,
+                    w[5],
+                    force_cargo_normal*np.sin(w[0])/SHIP_MASS,
+                    w[7],
+                    -GRAV_ACC * np.sin(w[0])])
+
+
+def RK4FallingCargo(derivative, b0, ta, tb, dt, *, retstep=False, stats=None, **fkwargs):
+    """Runs the Runge-Kutta of method the 4th order on the given input, with a check for capsizing, and for the cargo falling off
+
+    - If the ship capsizes, the rest of the time-steps are filled with a capsized state
+    - If the cargo falls off, its mass is set to 0 for the remainder of the simulation, thus removing its influence from the system
+
+    Args:
+        derivative (callable(float, np.ndarray, **kwargs)->np.ndarray): Derivative function, returns array of derivative of each element in the input array
+        b0 (np.ndarray): initial state of the system
+        ta (float): start time
+        tb (float): end time
+        dt (float): approximate size of the time step
+        retstep (bool, optional): If True, return (t, w_array, box_fall, step), where step is the spacing between samples. Defaults to False.
+        stats (dict, optional): If given, the number of 'steps', evaluations of derivative 'nfev', whether the ship 'capsized' and whether the 'cargo_fell' are stored in it. Defaults to None.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, int]: array of times, the corresponding evaluated system states and the index the box falls off on (-1 if still on)
+    """
+
+    num_iter = int((tb-ta)/dt)
+    t, dt = np.linspace(ta, tb, num_iter + 1, retstep=True)
+    w_array = np.zeros((len(b0), num_iter + 1))
+    w_array[:, 0] = b0
+
+    beta, err = calculate_beta(fkwargs['cargo_mass'])
+    fkwargs['beta'] = beta
+    box_on = True
+    box_off_index = -1
+    capsized = False
+    for i in range(num_iter):
+        wn = RK4Step(derivative, w_array[:, i], t[i], dt, **fkwargs)
+        if box_on and abs(wn[6]) > SHIP_RADIUS:
+            box_on = False
+            box_off_index = i
+            fkwargs['beta'] = BETA
+            fkwargs['cargo_mass'] = 0
+        if isCapsized(wn[0], wn[2]):
+            w_array[0, i+1:] = np.sign(w_array[0, i])*np.pi*0.5
+            capsized = True
+            break
+        w_array[:, i+1] = wn
+
+    if stats is not None:
+        steps = i + 1 if num_iter else 0
+        stats.update(steps=steps, nfev=4*steps, capsized=capsized, cargo_fell=not box_on)
+
+    # Returning results
+    if retstep:
+        return t, w_array, box_off_index, dt
+    return t, w_array, box_off_index
+
+
+def RK4Railing(derivative, b0, ta, tb, dt, *, retstep=False, stats=None, **fkwargs):
+    """Runs the Runge-Kutta of method the 4th order on the given input, with a check for capsizing, and holds the cargo inside with railings
+
+    - If the ship capsizes, the rest of the time-steps are filled with a capsized state
+    - If the cargo should falls off, it is completely stopped by a "fence", disregarding the physicalities of that
+
+    Args:
+        derivative (callable(float, np.ndarray, **kwargs)->np.ndarray): Derivative function, returns array of derivative of each element in the input array
+        b0 (np.ndarray): initial state of the system
+        ta (float): start time
+        tb (float): end time
+        dt (float): approximate size of the time step
+        retstep (bool, optional): If True, return (t, w_array, step), where step is the spacing between samples. Defaults to False.
+        stats (dict, optional): If given, the number of 'steps', evaluations of derivative 'nfev', whether the ship 'capsized' and the number of steps the cargo was stopped by the railing, 'railing_stops', are stored in it. Defaults to None.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: array of times, and the corresponding evaluated system states
+    """
+
+    num_iter = int((tb-ta)/dt)
+    t, dt = np.linspace(ta, tb, num_iter + 1, retstep=True)
+    w_array = np.zeros((len(b0), num_iter + 1))
+    w_array[:, 0] = b0
+    beta, err = calculate_beta(fkwargs['cargo_mass'])
+    fkwargs['beta'] = beta
+    capsized = False
+    railing_stops = 0
+
+    for i in range(num_iter):
+        wn = RK4Step(derivative, w_array[:, i], t[i], dt, **fkwargs)
+        if abs(wn[6]) > SHIP_RADIUS:
+            wn[6] = SHIP_RADIUS*np.sign(wn[6])
+            wn[7] = 0
+            railing_stops += 1
+        if isCapsized(wn[0], wn[2]):
+            w_array[0, i+1:] = np.sign(w_array[0, i])*np.pi*0.5
+            capsized = True
+            break
+        w_array[:, i+1] = wn
+
+    if stats is not None:
+        steps = i + 1 if num_iter else 0
+        stats.update(steps=steps, nfev=4*steps, capsized=capsized, railing_stops=railing_stops)
+
+    # Returning results
+    if retstep:
+        return t, w_array, dt
+    return t, w_array
+
+
+def derivative_wind_friction(t, w, **kwargs):
+    """Calculates the derivative of w, considering: 
+    
+    - The buoyance force
+    - The gravitational force
+    - The dynamics of the cargo
+    - Wind oscillations
+    - Water friction
+
+    Args:
+        t (float): time
+        w (np.ndarray): vector of form [theta, omega, y_C, v_yC, x_C, v_xC, s_L, v_L]
+        kwargs ("dict"): must contain: 'cargo_mass', 'k_f', 'force_wind0', 'omega_omega'
+
+    Returns:
+        np.ndarray: derivative of form [d theta, d omega, d y_C, d v_yC, d x_C, d v_xC, d s_L, d v_L]
+    """
+    cargo_mass, k_f, force_wind0, omega_omega = itemgetter('cargo_mass', 'k_f', 'force_wind0', 'omega_omega')(kwargs)
+    beta = kwargs.get('beta', BETA)
+
+    y_M_0 = SHIP_RADIUS*np.cos(beta/2)
+    y_C_0 = y_M_0 - DISTANCE_MC
+    delta_Yc = w[2] - y_C_0
+    gamma = 2*np.arccos(np.cos(beta*0.5) - (4/(3*np.pi)) * (1 - np.cos(w[0])) + delta_Yc/SHIP_RADIUS)
+    area_water = 0.5*SHIP_RADIUS**2 * (gamma - np.sin(gamma))
+    force_buoy = GRAV_ACC*WATER_DENSITY*area_water  # [N] buoyancy force
+    force_grav = GRAV_ACC*SHIP_MASS
+    force_cargo_normal = GRAV_ACC*cargo_mass*np.cos(w[0])
+
+    force_wind = force_wind0*np.cos(omega_omega * t)
+    force_friction = k_f * SHIP_RADIUS * gamma * w[1]
+
+    return np.array([w[1],
+                    (-force_buoy*DISTANCE_MC*np.sin(w[0]) - force_cargo_normal*w[6] + force_wind*w[2] - force_friction * (w[2] + SHIP_RADIUS*(1 - np.cos(gamma/2)))) / SHIP_INERTIA,
+                    w[3],
+                    (force_buoy - force_grav - force_cargo_normal*np.cos(w[0]))/SHIP_MASS,
+                    w[5],
+                    (force_cargo_normal*np.sin(w[0]) + force_wind - force_friction)/SHIP_MASS,
+                    w[7],
+                    -GRAV_ACC * np.sin(w[0])])
+
+
+def derivativeCargoWind(t, w, **kwargs):
+    """Calculates the derivative of w, considering: 
+    
+    - The buoyance force
+    - The gravitational force
+    - The dynamics of the cargo
+    - Wind oscillations
+    - Water friction
+    - Kinetic friction for the cargo
+
+    Args:
+        t (float): time
+        w (np.ndarray): vector of form [theta, omega, y_C, v_yC, x_C, v_xC, s_L, v_L]
+        kwargs ("dict"): must contain: 'cargo_mass', 'k_f', 'force_wind0', 'omega_omega', 'mu'
+
+    Returns:
+        np.ndarray: derivative of form [d theta, d omega, d y_C, d v_yC, d x_C, d v_xC, d s_L, d v_L]
+    """
+    cargo_mass, k_f, force_wind0, omega_omega, mu = itemgetter('cargo_mass', 'k_f', 'force_wind0', 'omega_omega', 'mu')(kwargs)
+    beta = kwargs.get('beta', BETA)
+
+    y_M_0 = SHIP_RADIUS*np.cos(beta/2)
+    y_C_0 = y_M_0 - DISTANCE_MC
+    delta_Yc = w[2] - y_C_0
+    gamma = 2*np.arccos(np.cos(beta*0.5) - (4/(3*np.pi)) * (1 - np.cos(w[0])) + delta_Yc/SHIP_RADIUS)
+    area_water = 0.5*SHIP_RADIUS**2 * (gamma - np.sin(gamma))
+    force_buoy = GRAV_ACC*WATER_DENSITY*area_water  # [N] buoyancy force
+    force_grav = GRAV_ACC*SHIP_MASS
+    force_cargo_normal = GRAV_ACC*cargo_mass*np.cos(w[0])
+    force_cargo_friction = np.sign(w[7]) * mu*force_cargo_normal
+
+    force_wind = force_wind0*np.cos(omega_omega * t)
+    force_friction = k_f * SHIP_RADIUS * gamma * w[1]
+
+    return np.array([w[1], 
+                    (-force_buoy*DISTANCE_MC*np.sin(w[0]) - force_cargo_normal*w[6] + force_wind*w[2] - force_friction * (w[2] + SHIP_RADIUS*(1 - np.cos(gamma/2))) + force_cargo_friction*DISTANCE_MC)/SHIP_INERTIA, 
+                    w[3], 
+                    (force_buoy - force_grav - force_cargo_normal*np.cos(w[0]) - force_cargo_friction*np.sin(w[0]))/SHIP_MASS, 
+                    w[5], 
+                    (force_cargo_normal*np.sin(w[0]) + force_wind - force_friction + force_cargo_friction*np.cos(w[0]))/SHIP_MASS,
+                    w[7], 
+                    -GRAV_ACC * np.sin(w[0]) - force_cargo_friction/cargo_mass])
+
+
+def method1(w, h, k1, k2, k3):
+    return w + h*(2/9*k1 + 1/3*k2 + 4/9*k3)
+
+
+def method2(w, h, k1, k2, k3, k4):
+    return w + h*(7/24*k1 + 1/4*k2 + 1/3*k3 + 1/8*k4)
+
+
+def adaptiveODESolver(derivative, b0, ta, tb, h0, tol, P = 0.8, *, stats=None, **fkwargs):
+    # If stats is a dict, the number of accepted 'steps', 'rejected' steps, evaluations of derivative 'nfev',
+    # steps the cargo was stopped by the railing 'railing_stops' and whether the ship 'capsized' are stored in it
+    # Declaring arrays
+    t = np.array([ta])
+    w = b0
+    
+    # Declaring variables
+    p = 2
+    hn = h0
+    tn = ta
+    wn = b0
+    iterations = 0
+    rejected = 0
+    railing_stops = 0
+    capsized = False
+    
+    # Declaring the initial Runge-Kutta constants 
+    k1 = derivative(tn, wn, **fkwargs)
+    k2 = derivative(tn + 1/2*hn, wn + 1/2*hn*k1, **fkwargs)
+    k3 = derivative(tn + 3/4*hn, wn + 3/4*hn*k2, **fkwargs)
+    k4 = derivative(tn + hn, wn + hn*(2/9*k1 + 1/3*k2 + 4/9*k3), **fkwargs)
+    
+    while (tn < tb - 1.0e-10):
+        if iterations >= 50_000:
+            print("Too much work")
+            break
+        iterations += 1
+        old_wn = wn
+        
+        # Changes h if it is too big
+        if tn + hn > tb:
+            hn = tb - tn
+
+        m1 = method1(wn, hn, k1, k2, k3)
+        m2 = method2(wn, hn, k1, k2, k3, k4)
+
+        #Note that we are using the euclidean norm
+        errorEstimate = np.linalg.norm(m2 - m1, 2) 
+        if (errorEstimate <= tol): 
+        #Accept changes
+            tn += hn
+            wn = m1
+            w = np.c_[w, wn]
+            t = np.append(t, tn)
+        else:
+            rejected += 1
+            
+        # Change based on conditions:
+        if abs(wn[6]) > SHIP_RADIUS:
+            wn[6] = old_wn[6]
+            wn[7] = 0
+            railing_stops += 1
+        if isCapsized(wn[0], wn[2]):
+            t = np.append(t, tn+hn)
+            t = np.append(t, tb)
+            bEnd = np.zeros(len(w))
+            bEnd[0] = np.sign(wn[0])*np.pi*0.5
+            w = np.c_[w, bEnd]
+            w = np.c_[w, bEnd]
+            capsized = True
+            break 
+            
+            
+        # Adjusts stepsize   
+        if errorEstimate != 0:
+            hn = P * (tol/errorEstimate)**(1/(p+1)) * hn
+        else:
+            hn = h0
+        
+        # Adjusts Runge-Kutta constants 
+        # k1_n+1 = k4_n, because method 1 agrees with k4 in terms of the koefficients of the k constants, and k4 is taken at the same  t-value as k1_n+1
+        if (errorEstimate <= tol): 
+            k1 = k4
+        k2 = derivative(tn + 1/2*hn, wn + 1/2*hn*k1, **fkwargs)
+        k3 = derivative(tn + 3/4*hn, wn + 3/4*hn*k2, **fkwargs)
+        k4 = derivative(tn + hn, wn + hn*(2/9*k1 + 1/3*k2 + 4/9*k3), **fkwargs)
+        
+    
+    if stats is not None:
+        stats.update(steps=iterations - rejected, rejected=rejected, nfev=4 + 3*(iterations - capsized),
+                     railing_stops=railing_stops, capsized=capsized)
+
+    # Returning results
+    return t, w
+
+
+def nonAdaptiveBogShamp(derivative, b0, ta, tb, h0, **fkwargs):
+    # Declaring arrays
+    t = np.array([ta])
+    w = b0
+    
+    # Declaring variables
+    p = 2
+    hn = h0
+    tn = ta
+    wn = b0
+    
+    # Declaring the initial Runge-Kutta constants 
+    k1 = derivative(tn, wn, **fkwargs)
+    k2 = derivative(tn + 1/2*hn, wn + 1/2*hn*k1, **fkwargs)
+    k3 = derivative(tn + 3/4*hn, wn + 3/4*hn*k2, **fkwargs)
+    k4 = derivative(tn + hn, wn + hn*(2/9*k1 + 1/3*k2 + 4/9*k3), **fkwargs)
+    
+    while (tn < tb - 1.0e-10):
+        old_wn = wn
+        
+        # Changes h if it is too big
+        if tn + hn > tb:
+            hn = tb - tn
+
+        m1 = method1(wn, hn, k1, k2, k3)
+        m2 = method2(wn, hn, k1, k2, k3, k4)
+
+        tn += hn
+        wn = m1
+        w = np.c_[w, wn]
+        t = np.append(t, tn)
+            
+        # Change based on conditions:
+        if abs(wn[6]) > SHIP_RADIUS:
+            wn[6] = old_wn[6]
+            wn[7] = 0
+        if isCapsized(wn[0], wn[2]):
+            t = np.append(t, tn+hn)
+            t = np.append(t, tb)
+            bEnd = np.zeros(len(w))
+            bEnd[0] = np.sign(wn[0])*np.pi*0.5
+            w = np.c_[w, bEnd]
+            w = np.c_[w, bEnd]
+            break 
+            
+        k1 = k4
+        k2 = derivative(tn + 1/2*hn, wn + 1/2*hn*k1, **fkwargs)
+        k3 = derivative(tn + 3/4*hn, wn + 3/4*hn*k2, **fkwargs)
+        k4 = derivative(tn + hn, wn + hn*(2/9*k1 + 1/3*k2 + 4/9*k3), **fkwargs)
+        
+    
+    # Returning results
+    return t, w
@@ -0,0 +1,294 @@
+"""Chunked, indexed storage of simulated trajectories.
+
+Replaces the np.savez files of the notebook, which were named by a single parameter, so they
+collided between runs and had to be read into memory in full. Every run gets its own folder of
+compressed chunks of at most chunk_size time steps, and an entry in index.json with all the
+parameters of the run and the solver used, so runs can be found again by their parameters.
+Trajectories are read one chunk at a time, restricted to a window of time and decimated while
+reading, so the memory used only depends on the size of the result and the chunk size.
+"""
+
+import contextlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _to_json(value):
+    # Converts numpy scalars and arrays to something json can store
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _is_numeric(value):
+    try:
+        return np.asarray(value).dtype.kind in "biufc"
+    except ValueError:  # ragged sequences
+        return False
+
+
+class TrajectoryWriter:
+    """Writes one run to the store a chunk at a time, so it never has to be held in memory in full
+
+    Created by TrajectoryStore.open_run. The run is added to the index when close is called.
+    """
+
+    def __init__(self, store, record):
+        self.store = store
+        self.record = record
+        self._t = []
+        self._w = []
+        self._buffered = 0
+
+    def append(self, t, w):
+        """Appends time steps to the run
+
+        Args:
+            t (np.ndarray): times, of shape (n,)
+            w (np.ndarray): the corresponding system states, of shape (n_state, n)
+        """
+        t = np.atleast_1d(t)
+        w = np.asarray(w).reshape(-1, len(t))
+        self._t.append(t)
+        self._w.append(w)
+        self._buffered += len(t)
+        while self._buffered >= self.record['chunk_size']:
+            self._flush(self.record['chunk_size'])
+
+    def _flush(self, n):
+        t = np.concatenate(self._t)
+        w = np.concatenate(self._w, axis=1)
+        chunk = len(self.record['chunks'])
+        filename = f"chunk_{chunk:05d}.npz"
+        np.savez_compressed(os.path.join(self.store.path, self.record['run_id'], filename), t=t[:n], w=w[:, :n])
+        self.record['chunks'].append({'file': filename, 't_start': float(t[0]), 't_end': float(t[n-1]), 'size': n})
+        self.record['n_state'] = len(w)
+        self.record['size'] += n
+        self._t, self._w = ([t[n:]], [w[:, n:]]) if n < len(t) else ([], [])
+        self._buffered = len(t) - n
+
+    def close(self):
+        """Writes the remaining time steps, and adds the run to the index
+
+        Returns:
+            str: the id of the run
+        """
+        if self._buffered:
+            self._flush(self._buffered)
+        self.store._add(self.record)
+        return self.record['run_id']
+
+    def discard(self):
+        """Deletes the chunks written so far, without adding the run to the index
+        """
+        shutil.rmtree(os.path.join(self.store.path, self.record['run_id']), ignore_errors=True)
+        self._t, self._w, self._buffered = [], [], 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class TrajectoryStore:
+    """A folder of trajectories, with an index of the parameters and solver of each run
+
+    Args:
+        path (str, optional): folder of the store, created if it does not exist. Defaults to "trajectories".
+        chunk_size (int, optional): maximum number of time steps per chunk. Defaults to 10_000.
+    """
+
+    def __init__(self, path="trajectories", chunk_size=10_000):
+        self.path = path
+        self.chunk_size = chunk_size
+        os.makedirs(path, exist_ok=True)
+
+    @property
+    def _index_file(self):
+        return os.path.join(self.path, "index.json")
+
+    def index(self):
+        """Returns the index of the store
+
+        Returns:
+            list[dict]: one record per run, with 'run_id', 'kind', 'solver', 'params', 'created', 'size' and 'chunks'
+        """
+        if not os.path.exists(self._index_file):
+            return []
+        with open(self._index_file) as f:
+            return json.load(f)
+
+    @contextlib.contextmanager
+    def _index_lock(self):
+        # Holds an exclusive lock on index.lock, so runs written at the same time by several
+        # processes do not overwrite each other's entries. The lock is released if the process dies.
+        with open(os.path.join(self.path, "index.lock"), "a+") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _update_index(self, update):
+        # Reads, updates and writes the index under the lock. The new index is written to a temporary
+        # file first, so an interrupted write never leaves a broken index, and readers need no lock.
+        with self._index_lock():
+            records = update(self.index())
+            tmp = f"{self._index_file}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(records, f, indent=1)
+            os.replace(tmp, self._index_file)
+
+    def _add(self, record):
+        self._update_index(lambda records: records + [record])
+
+    def open_run(self, kind, *, solver, chunk_size=None, **params):
+        """Starts a new run, which is written chunk by chunk
+
+        Args:
+            kind (str): the kind of simulation, e.g. "Railing" or "FallingCargo"
+            solver (str): name of the solver used, e.g. "RK4Railing"
+            chunk_size (int, optional): maximum number of time steps per chunk. Defaults to the store's chunk_size.
+            params: all parameters of the run, e.g. cargo_mass, k_f, dt and b0
+
+        Returns:
+            TrajectoryWriter: writer to append the time steps to
+        """
+        run_id = f"{kind}_{time.strftime('%Y%m%d-%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        os.makedirs(os.path.join(self.path, run_id))
+        record = {'run_id': run_id, 'kind': kind, 'solver': solver,
+                  'params': {key: _to_json(value) for key, value in params.items()},
+                  'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'chunk_size': chunk_size or self.chunk_size,
+                  'size': 0, 'n_state': 0, 'chunks': []}
+        return TrajectoryWriter(self, record)
+
+    def save(self, kind, t, w, *, solver, **params):
+        """Saves a finished run
+
+        Args:
+            kind (str): the kind of simulation, e.g. "Railing" or "FallingCargo"
+            t (np.ndarray): array of times
+            w (np.ndarray): the corresponding system states, of shape (n_state, len(t))
+            solver (str): name of the solver used, e.g. "RK4Railing"
+            params: all parameters of the run, e.g. cargo_mass, k_f, dt and b0
+
+        Returns:
+            str: the id of the run
+        """
+        writer = self.open_run(kind, solver=solver, **params)
+        writer.append(t, w)
+        return writer.close()
+
+    def find(self, kind=None, solver=None, **params):
+        """Finds the runs with the given kind, solver and parameters
+
+        Numeric parameters are compared with np.allclose, anything else, like strings and None, with ==.
+
+        Returns:
+            list[dict]: the records of the matching runs, oldest first
+        """
+        def matches(record):
+            if kind is not None and record['kind'] != kind:
+                return False
+            if solver is not None and record['solver'] != solver:
+                return False
+            for key, value in params.items():
+                if key not in record['params']:
+                    return False
+                stored = record['params'][key]
+                if not (_is_numeric(value) and _is_numeric(stored)):
+                    # Stored through json, so tuples are compared as lists
+                    if json.loads(json.dumps(_to_json(value))) != stored:
+                        return False
+                elif np.shape(value) != np.shape(stored) or not np.allclose(value, stored):
+                    return False
+            return True
+
+        return [record for record in self.index() if matches(record)]
+
+    def _record(self, run_id):
+        for record in self.index():
+            if record['run_id'] == run_id:
+                return record
+        raise KeyError(f"No run with id {run_id}")
+
+    def iter_chunks(self, run_id, t_min=-np.inf, t_max=np.inf, step=1):
+        """Reads a run one chunk at a time
+
+        Args:
+            run_id (str): the id of the run
+            t_min (float, optional): start of the time window. Defaults to -inf.
+            t_max (float, optional): end of the time window. Defaults to inf.
+            step (int, optional): only every step'th time step within the window is returned. Defaults to 1.
+
+        Yields:
+            tuple[np.ndarray, np.ndarray]: times and the corresponding system states of each chunk
+        """
+        record = self._record(run_id)
+        taken = 0  # number of time steps in the window before the current chunk
+        for chunk in record['chunks']:
+            if chunk['t_end'] < t_min:
+                continue
+            if chunk['t_start'] > t_max:
+                break
+            with np.load(os.path.join(self.path, run_id, chunk['file'])) as data:
+                t, w = data['t'], data['w']
+            inside = np.flatnonzero((t >= t_min) & (t <= t_max))
+            selected = inside[(taken + np.arange(len(inside))) % step == 0]
+            taken += len(inside)
+            if len(selected):
+                yield t[selected], w[:, selected]
+
+    def load(self, run_id, t_min=-np.inf, t_max=np.inf, step=1):
+        """Reads a run, or a window of it, decimated by step
+
+        Takes the same arguments as iter_chunks.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: array of times, and the corresponding system states
+        """
+        record = self._record(run_id)
+        t_parts, w_parts = [], []
+        for t, w in self.iter_chunks(run_id, t_min, t_max, step):
+            t_parts.append(t)
+            w_parts.append(w)
+        if not t_parts:
+            return np.zeros(0), np.zeros((record['n_state'], 0))
+        return np.concatenate(t_parts), np.concatenate(w_parts, axis=1)
+
+    def remove(self, run_id):
+        """Deletes a run and its chunks from the store
+
+        Args:
+            run_id (str): the id of the run
+        """
+        record = self._record(run_id)
+        for chunk in record['chunks']:
+            os.remove(os.path.join(self.path, run_id, chunk['file']))
+        os.rmdir(os.path.join(self.path, run_id))
+        self._update_index(lambda records: [r for r in records if r['run_id'] != run_id])
@@ -0,0 +1,83 @@
+"""Work-precision comparison of Dormand-Prince 5(4), Bogacki-Shampine 3(2) and fixed-step RK4.
+
+Uses the 240 s scenario of solveODEWind/testBeat in the notebook. The error is the largest
+difference in theta from a reference solution, sampled once per second, and the work is the
+number of evaluations of the derivative and the run time.
+"""
+
+import time
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from ShipModel import (SHIP_MASS, SHIP_RADIUS, DISTANCE_MC, GRAV_ACC, RESONANCE_FREQUENCY, calculate_beta,
+                       RK4Railing, derivative_wind_friction)
+from AdaptiveSolver import adaptiveODESolverDense, capsize_event, railing_events
+
+
+def beatScenario():
+    """Returns the initial state, time interval and parameters of testBeat
+
+    Returns:
+        tuple[np.ndarray, float, float, dict]: initial state, start time, end time and parameters
+    """
+    fkwargs = dict(cargo_mass=0, k_f=100, force_wind0=0.625*SHIP_MASS*GRAV_ACC, omega_omega=0.93*RESONANCE_FREQUENCY)
+    beta, err = calculate_beta(fkwargs['cargo_mass'])
+    b0 = np.array([0, np.deg2rad(2), SHIP_RADIUS*np.cos(beta/2) - DISTANCE_MC, 0, 0, 0, 3, 0])
+    return b0, 0, 240, fkwargs
+
+
+def workPrecision():
+    """Runs every method at a range of tolerances or step sizes, and plots error against work
+    """
+    b0, ta, tb, fkwargs = beatScenario()
+    events = (capsize_event, *railing_events)
+    t_sample = np.arange(ta, tb + 0.5, 1.0)
+
+    reference = adaptiveODESolverDense(derivative_wind_friction, b0, ta, tb, 0.01, None, method="DP54",
+                                       atol=1e-12, rtol=1e-12, events=events, **fkwargs)
+    theta_ref = reference(t_sample)[0]
+
+    results = {}
+    for method in ("DP54", "BS32"):
+        results[method] = []
+        for tol in (1e-4, 1e-5, 1e-6, 1e-7, 1e-8):
+            start = time.perf_counter()
+            sol = adaptiveODESolverDense(derivative_wind_friction, b0, ta, tb, 0.01, None, method=method,
+                                         atol=tol, rtol=tol, events=events, **fkwargs)
+            elapsed = time.perf_counter() - start
+            error = np.max(np.abs(sol(t_sample)[0] - theta_ref))
+            results[method].append((sol.nfev, elapsed, error))
+
+    results["RK4"] = []
+    for dt in (0.1, 0.05, 0.02, 0.01, 0.005):
+        start = time.perf_counter()
+        t, w = RK4Railing(derivative_wind_friction, b0, ta, tb, dt, **dict(fkwargs))
+        elapsed = time.perf_counter() - start
+        stride = int(round(1.0/dt))
+        error = np.max(np.abs(w[0, ::stride] - theta_ref))
+        results["RK4"].append((4*(len(t) - 1), elapsed, error))
+
+    print(f"{'method':>6} {'nfev':>8} {'time [s]':>9} {'max error in theta':>19}")
+    for method, rows in results.items():
+        for nfev, elapsed, error in rows:
+            print(f"{method:>6} {nfev:8d} {elapsed:9.3f} {error:19.3e}")
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(10, 5))
+    for method, rows in results.items():
+        nfev, elapsed, error = np.array(rows).T
+        ax1.loglog(nfev, error, "o-", label=method)
+        ax2.loglog(elapsed, error, "o-", label=method)
+    ax1.set_xlabel('Evaluations of the derivative', fontsize=12)
+    ax2.set_xlabel('Run time [s]', fontsize=12)
+    for ax in (ax1, ax2):
+        ax.set_ylabel('max error in $\\theta$ [rad]', fontsize=12)
+        ax.set_title("Work-precision, 240 s beat scenario", fontsize=14)
+        ax.legend()
+        ax.grid(True)
+    plt.tight_layout()
+    plt.show()
+
+
+if __name__ == "__main__":
+    workPrecision()
@@ -0,0 +1,93 @@
+"""Opt-in counting and timing of calls to user functions.
+
+Counts how many times an integrand, root-finding function or right-hand side is called, and the
+total time spent in it. Nothing is changed unless a function is wrapped, so there is no overhead
+when instrumentation is not used. Functions that are passed as arguments are wrapped with counted:
+
+    derivative = counted(derivative_wind_friction)
+    RK4Railing(derivative, b0, 0, 20, 0.01, cargo_mass=0)
+    derivative.stats.calls, derivative.stats.time
+
+Functions that a kernel looks up as a global, like f in Numerical-Methods, are replaced for the
+duration of a with block by instrumented:
+
+    trapezoidal = load_definitions("Numerical-Methods/Trapezoidal-Method.py")
+    with instrumented(trapezoidal, "f", "f_double_prime") as stats:
+        trapezoidal.trapezoidal_rule(0, 1, 1000)
+    stats["f"].calls
+
+Compiled numba kernels cannot be wrapped, since they call each other directly. The Monte Carlo
+kernels of Project 1 take a counts array instead, and the ODE solvers of Project 3 a stats dict.
+"""
+
+import contextlib
+import functools
+import time
+
+
+class CallStats:
+    """Number of calls to a function, and the total time spent in it in seconds
+    """
+    __slots__ = ("calls", "time")
+
+    def __init__(self):
+        self.calls = 0
+        self.time = 0.
+
+    def __repr__(self):
+        return f"CallStats(calls={self.calls}, time={self.time:.3g})"
+
+
+def counted(func, stats=None, *, timed=True):
+    """Wraps func, so its calls are counted in stats
+
+    Args:
+        func (callable): function to count the calls of
+        stats (CallStats, optional): where the calls are counted, to share it between functions. Defaults to a new CallStats.
+        timed (bool, optional): Also measure the time spent in func. Defaults to True.
+
+    Returns:
+        callable: the wrapped function, with the CallStats in its stats attribute
+    """
+    stats = CallStats() if stats is None else stats
+
+    if timed:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.time += time.perf_counter() - start
+                stats.calls += 1
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stats.calls += 1
+            return func(*args, **kwargs)
+
+    wrapper.stats = stats
+    return wrapper
+
+
+@contextlib.contextmanager
+def instrumented(namespace, *names, timed=True):
+    """Replaces the functions names in namespace with counted versions within a with block
+
+    Args:
+        namespace (module or object): where the functions are looked up, e.g. a module from load_definitions
+        names (str): names of the functions to count
+        timed (bool, optional): Also measure the time spent in the functions. Defaults to True.
+
+    Yields:
+        dict[str, CallStats]: the calls of each function
+    """
+    originals = {name: getattr(namespace, name) for name in names}
+    stats = {name: CallStats() for name in names}
+    try:
+        for name in names:
+            setattr(namespace, name, counted(originals[name], stats[name], timed=timed))
+        yield stats
+    finally:
+        for name, func in originals.items():
+            setattr(namespace, name, func)
@@ -0,0 +1,105 @@
+"""Imports the functions of the notebooks and scripts in this repository without running them.
+
+Most of the code lives in Project-Code.ipynb notebooks and in scripts with hyphens in their names,
+and many of them plot, print or call input() at the top level. load_definitions only runs the
+imports, function and class definitions and assignments of constants of a notebook or script,
+in order, so its kernels can be imported from benchmarks and notebooks:
+
+    trapezoidal = load_definitions("Numerical-Methods/Trapezoidal-Method.py")
+    trapezoidal.trapezoidal_rule(0, 1, 1000)
+
+An assignment is skipped if it calls a function defined in the same file, input(), print(),
+open(), anything on plt or the constructor of an imported class, since those are the ones that
+run simulations, read files, plot or create files (like store = TrajectoryStore(...)). Skipped
+assignments, and statements that fail because an optional dependency is missing (e.g. cv2), are
+listed in __skipped__. Constants that are assigned in several cells keep their last value.
+"""
+
+import ast
+import json
+import os
+import types
+
+import matplotlib
+matplotlib.use("Agg")  # never open a window, even if a definition plots
+
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SIDE_EFFECT_NAMES = {"input", "print", "open", "plt", "exec", "eval"}
+
+
+def _read_source(path):
+    if path.endswith(".ipynb"):
+        with open(path, encoding="utf-8") as f:
+            notebook = json.load(f)
+        cells = ["".join(cell["source"]) for cell in notebook["cells"] if cell["cell_type"] == "code"]
+    else:
+        with open(path, encoding="utf-8") as f:
+            cells = [f.read()]
+    # IPython magics and shell commands are not Python
+    return ["\n".join(line for line in cell.splitlines() if not line.lstrip().startswith(("%", "!")))
+            for cell in cells]
+
+
+def _calls_any(node, names):
+    for child in ast.walk(node):
+        if isinstance(child, ast.Call):
+            func = child.func
+            while isinstance(func, ast.Attribute):
+                func = func.value
+            if isinstance(func, ast.Name) and func.id in names:
+                return True
+    return False
+
+
+def _imported_classes(namespace, defined):
+    return {name for name, value in namespace.items()
+            if isinstance(value, type) and name not in defined and not name.startswith("__")}
+
+
+def _definitions(tree, namespace, defined):
+    """Yields the top-level statements of tree that only define something, and whether each is run
+    """
+    for statement in tree.body:
+        if isinstance(statement, (ast.Import, ast.ImportFrom)):
+            yield statement, True
+        elif isinstance(statement, (ast.FunctionDef, ast.ClassDef)):
+            defined.add(statement.name)
+            yield statement, True
+        elif isinstance(statement, (ast.Assign, ast.AnnAssign)) and statement.value is not None:
+            blocked = defined | _SIDE_EFFECT_NAMES | _imported_classes(namespace, defined)
+            yield statement, not _calls_any(statement.value, blocked)
+
+
+def load_definitions(path, name=None):
+    """Runs only the definitions of a notebook or script, and returns them as a module
+
+    Args:
+        path (str): path of a .py or .ipynb file, relative to the root of the repository or absolute
+        name (str, optional): name of the module. Defaults to the file name.
+
+    Returns:
+        types.ModuleType: module with the definitions, and the first line of each skipped assignment
+            and failed statement in __skipped__
+    """
+    path = os.path.join(REPOSITORY, path)
+    name = name or os.path.splitext(os.path.basename(path))[0].replace("-", "_")
+    module = types.ModuleType(name)
+    module.__file__ = path
+    module.__skipped__ = []
+    defined = set()
+
+    for n, cell in enumerate(_read_source(path)):
+        filename = f"{path} (cell {n})" if path.endswith(".ipynb") else path
+        tree = ast.parse(cell, filename=filename)
+        for statement, run in _definitions(tree, module.__dict__, defined):
+            if not run:
+                module.__skipped__.append(ast.unparse(statement).splitlines()[0])
+                continue
+            code = compile(ast.Module(body=[statement], type_ignores=[]), filename, "exec")
+            try:
+                exec(code, module.__dict__)
+            except (ImportError, NameError):
+                # Missing optional dependency, or a default argument that refers to skipped data
+                module.__skipped__.append(ast.unparse(statement).splitlines()[0])
+    return module
@@ -0,0 +1,317 @@
+"""Benchmarks of the numerical kernels of all three projects and Numerical-Methods.
+
+Every benchmark runs one kernel over a range of a scaling parameter (number of steps, grid size N,
+number of replicas R, polymer length L, rank d or time step dt), and reports the throughput, in
+work units per second, and the peak of the Python heap during one run. The results are compared against the baselines in
+baselines.json, which should be recorded on the machine the comparison is done on:
+
+    python benchmarks/run_benchmarks.py                   # run all, compare with the baselines
+    python benchmarks/run_benchmarks.py --quick NMF RK4   # smallest size only, names containing NMF or RK4
+    python benchmarks/run_benchmarks.py --save-baseline   # store the results as the new baselines
+    python benchmarks/run_benchmarks.py --counters        # also count calls, proposals and solver steps
+
+The throughput is the best of several runs after a warm-up run, which also compiles the numba
+kernels. The peak of the Python heap is measured with tracemalloc in a separate run, since tracing
+slows down pure Python code. tracemalloc only sees memory allocated through Python, including numpy
+arrays created outside the kernels, so arrays that numba kernels allocate internally are not
+counted, and the column says little about the JIT kernels. Nothing is plotted and nothing waits
+for input, so it runs headless.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import warnings
+from collections import namedtuple
+
+import numpy as np
+from numba import njit
+from numba.core.errors import NumbaTypeSafetyWarning
+
+from instrument import instrumented
+from loader import REPOSITORY, load_definitions
+
+sys.path.insert(0, os.path.join(REPOSITORY, "Project3-Technical-Physics"))
+
+# The polymer charges of set_grid_polymer are computed as floats and stored in an int grid
+warnings.simplefilter("ignore", NumbaTypeSafetyWarning)
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+SEED = 0
+
+# setup(value) returns a callable that runs the kernel once and returns the work done, and
+# counters(value), if given, runs it once more and returns its counters
+Benchmark = namedtuple("Benchmark", ["name", "parameter", "values", "unit", "setup", "counters"], defaults=(None,))
+
+
+@njit
+def _seed_numba(seed):
+    # numba has its own random generators, one for np.random and one for random
+    np.random.seed(seed)
+    random.seed(seed)
+
+
+def _calls_to(namespace, names, setup):
+    """Returns counters for a Benchmark, which count the calls to the functions names in namespace
+    """
+    def counters(value):
+        run = setup(value)
+        with instrumented(namespace, *names, timed=False) as stats:
+            run()
+        return {f"{name} calls": stats[name].calls for name in names}
+    return counters
+
+
+def _quadrature_benchmarks():
+    trapezoidal = load_definitions("Numerical-Methods/Trapezoidal-Method.py")
+    simpson = load_definitions("Numerical-Methods/Simpsons-Method.py")
+    adaptive = load_definitions("Numerical-Methods/Non-Recursive-Adaptive-Quadrature.py")
+
+    def trapezoidal_rule(steps):
+        def run():
+            trapezoidal.trapezoidal_rule(0, 1, steps)
+            return steps + 1
+        return run
+
+    def simpsons_method(steps):
+        def run():
+            simpson.simpsons_method(0, 1, steps)
+            return steps + 1
+        return run
+
+    def adaptive_quadrature_simpson(tolerance):
+        return lambda: adaptive.adaptive_quadrature_simpson(0, 1, tolerance)[1]
+
+    return [Benchmark("trapezoidal_rule", "steps", (1_000, 10_000, 100_000), "evaluations/s", trapezoidal_rule,
+                      _calls_to(trapezoidal, ["f", "f_double_prime"], trapezoidal_rule)),
+            Benchmark("simpsons_method", "steps", (1_000, 10_000, 100_000), "evaluations/s", simpsons_method,
+                      _calls_to(simpson, ["f", "f_fourth_prime"], simpsons_method)),
+            Benchmark("adaptive_quadrature_simpson", "tolerance", (1e-6, 1e-9, 1e-12), "subintervals/s",
+                      adaptive_quadrature_simpson, _calls_to(adaptive, ["f"], adaptive_quadrature_simpson))]
+
+
+def _root_finding_benchmarks():
+    bisection = load_definitions("Numerical-Methods/Bisection.py")
+    newton = load_definitions("Numerical-Methods/Newtons-Method.py")
+    calls = 1000
+
+    def bisection_method(tolerance):
+        def run():
+            for _ in range(calls):
+                bisection.bisection(0, 1, tolerance)
+            return calls
+        return run
+
+    def newton_method(tolerance):
+        def run():
+            for _ in range(calls):
+                # starts at 1, since f_prime(0) = 0 would stop the method before its first step
+                newton.newton_method(1, 100, tolerance)
+            return calls
+        return run
+
+    return [Benchmark("bisection", "tolerance", (1e-6, 1e-10, 1e-14), "solves/s", bisection_method,
+                      _calls_to(bisection, ["f"], bisection_method)),
+            Benchmark("newton_method", "tolerance", (1e-5, 1e-10, 1e-15), "solves/s", newton_method,
+                      _calls_to(newton, ["f", "f_prime"], newton_method))]
+
+
+def _monte_carlo_benchmarks():
+    biophysics = load_definitions("Project1-Biophysics/Project-Code.ipynb")
+    T = 300
+    N_s = 100_000
+
+    def monomers(N, counts=None):
+        M = N*N//9  # the same density as N = 15, M = 25 in the notebook
+        _seed_numba(SEED)
+        grid = biophysics.set_grid_monomers(N, M)
+
+        def run():
+            biophysics.MonteCarlo(N_s, N, M, T, grid.copy(), counts)  # MonteCarlo moves the monomers in place
+            return N_s
+        return run
+
+    def polymers(L, counts=None):
+        N, M, N_s_polymer = 30, 5, 20_000
+        _seed_numba(SEED)
+        grid = biophysics.set_grid_polymer(N, M, L)
+
+        def run():
+            biophysics.monte_carlo_polymer(N_s_polymer, N, M, T, grid, 1, counts)
+            return N_s_polymer
+        return run
+
+    def replicas(R, counts=None):
+        N, M = 15, 25
+        seeds = biophysics.replica_seeds(2*R, SEED)
+        grids = biophysics.set_grid_monomers_replicas(N, M, seeds[:R])
+
+        def run():
+            if counts is None:
+                biophysics.monte_carlo_replicas(N_s, N, M, T, grids.copy(), seeds[R:])
+            else:
+                # one row of counters per replica, since the replicas run in parallel
+                replica_counts = np.zeros((R, len(counts)), dtype=np.int64)
+                biophysics.monte_carlo_replicas(N_s, N, M, T, grids.copy(), seeds[R:], counts=replica_counts)
+                counts[:] += replica_counts.sum(axis=0)
+            return R*N_s
+        return run
+
+    def mc_counters(setup):
+        def counters(value):
+            counts = np.zeros(biophysics.MC_NUM_COUNTERS, dtype=np.int64)
+            setup(value, counts)()
+            return biophysics.mc_counters(counts)
+        return counters
+
+    return [Benchmark("MonteCarlo", "N", (15, 30, 60), "steps/s", monomers, mc_counters(monomers)),
+            Benchmark("monte_carlo_replicas", "R", (1, 4, 16), "steps/s", replicas, mc_counters(replicas)),
+            Benchmark("monte_carlo_polymer (medium flexibility)", "L", (5, 15, 30), "steps/s", polymers,
+                      mc_counters(polymers))]
+
+
+def _nmf_benchmarks():
+    industrial = load_definitions("Project2-Industrial-Mathematics/Project-Code.ipynb")
+    maxiter = 50
+    # The same shape as 500 images of 32x32 pixels with three colour channels
+    A = np.random.default_rng(SEED).uniform(0, 1, (3*32*32, 500))
+
+    def nmf(d):
+        def run():
+            industrial.NMF(A, d, maxiter=maxiter, seed=SEED)
+            return maxiter
+        return run
+
+    return [Benchmark("NMF", "d", (16, 64, 256), "iterations/s", nmf)]
+
+
+def _ode_benchmarks():
+    from ShipModel import (SHIP_MASS, SHIP_RADIUS, DISTANCE_MC, GRAV_ACC, RESONANCE_FREQUENCY, calculate_beta,
+                           RK4Railing, derivative_wind_friction)
+    from CompiledRK4 import RK4RailingJit, derivative_wind_friction_kernel
+
+    fkwargs = dict(cargo_mass=0.02*SHIP_MASS, k_f=100, force_wind0=0.625*SHIP_MASS*GRAV_ACC,
+                   omega_omega=0.93*RESONANCE_FREQUENCY)
+    beta, err = calculate_beta(fkwargs['cargo_mass'])
+    b0 = np.array([0, np.deg2rad(2), SHIP_RADIUS*np.cos(beta/2) - DISTANCE_MC, 0, 0, 0, 3, 0])
+    tb = 20
+
+    def rk4_railing(dt, stats=None):
+        return lambda: len(RK4Railing(derivative_wind_friction, b0, 0, tb, dt, stats=stats, **fkwargs)[0]) - 1
+
+    def rk4_railing_counters(dt):
+        stats = {}
+        rk4_railing(dt, stats)()
+        return stats
+
+    def rk4_railing_jit(dt):
+        return lambda: len(RK4RailingJit(derivative_wind_friction_kernel, b0, 0, tb, dt, **fkwargs)[0]) - 1
+
+    return [Benchmark("RK4Railing", "dt", (0.01, 0.005, 0.0025), "steps/s", rk4_railing, rk4_railing_counters),
+            Benchmark("RK4RailingJit", "dt", (0.001, 0.0001), "steps/s", rk4_railing_jit)]
+
+
+BENCHMARK_GROUPS = (_quadrature_benchmarks, _root_finding_benchmarks, _monte_carlo_benchmarks,
+                    _nmf_benchmarks, _ode_benchmarks)
+
+
+def measure(run, repeats=3):
+    """Measures the throughput and the peak of the Python heap of run
+
+    Args:
+        run (callable): runs the kernel once, and returns the number of work units done
+        repeats (int, optional): number of timed runs, of which the fastest is used. Defaults to 3.
+
+    Returns:
+        tuple[float, float]: work units per second, and peak of the Python heap in MB, as seen by tracemalloc
+    """
+    with contextlib.redirect_stdout(io.StringIO()):  # some kernels print their progress
+        run()  # warm-up, and compilation of numba kernels
+        best = np.inf
+        for _ in range(repeats):
+            start = time.perf_counter()
+            work = run()
+            best = min(best, time.perf_counter() - start)
+
+        tracemalloc.start()
+        run()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return work/best, peak/1e6
+
+
+def _key(benchmark, value):
+    return f"{benchmark.name}[{benchmark.parameter}={value}]"
+
+
+def _compare(result, baseline, tolerance):
+    if baseline is None:
+        return "no baseline"
+    ratio = result["throughput"]/baseline["throughput"]
+    status = f"{ratio:5.2f}x"
+    if ratio < 1/(1 + tolerance):
+        status += " SLOWER"
+    elif ratio > 1 + tolerance:
+        status += " faster"
+    if result["peak_memory_mb"] > baseline["peak_memory_mb"]*(1 + tolerance) + 0.1:
+        status += " MORE MEMORY"
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the numerical kernels of the repository")
+    parser.add_argument("names", nargs="*", help="only run benchmarks whose name contains one of these")
+    parser.add_argument("--quick", action="store_true", help="only run the smallest size of each benchmark")
+    parser.add_argument("--repeats", type=int, default=3, help="number of timed runs of each size")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative change reported as a regression")
+    parser.add_argument("--counters", action="store_true", help="also print the counters of each benchmark")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results in baselines.json")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on a regression")
+    args = parser.parse_args(argv)
+
+    baselines = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baselines = json.load(f)
+
+    results = {}
+    regression = False
+    print(f"{'benchmark':<50} {'throughput':>24} {'python heap':>12}  vs. baseline")
+    for group in BENCHMARK_GROUPS:
+        for benchmark in group():
+            if args.names and not any(name in benchmark.name for name in args.names):
+                continue
+            for value in benchmark.values[:1] if args.quick else benchmark.values:
+                _seed_numba(SEED)
+                throughput, peak = measure(benchmark.setup(value), args.repeats)
+                key = _key(benchmark, value)
+                results[key] = {"throughput": throughput, "unit": benchmark.unit, "peak_memory_mb": peak}
+                status = _compare(results[key], baselines.get("results", {}).get(key), args.tolerance)
+                regression |= "SLOWER" in status or "MORE MEMORY" in status
+                print(f"{key:<50} {throughput:>10.4g} {benchmark.unit:<13} {peak:>9.2f} MB  {status}", flush=True)
+                if args.counters and benchmark.counters is not None:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        _seed_numba(SEED)
+                        counters = benchmark.counters(value)
+                    print("    " + ", ".join(f"{name}: {count}" for name, count in counters.items()))
+
+    if args.save_baseline:
+        baselines = {"machine": {"platform": platform.platform(), "processor": platform.processor(),
+                                 "python": platform.python_version(), "cpus": os.cpu_count()},
+                     "results": {**baselines.get("results", {}), **results}}
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(baselines, f, indent=1)
+        print(f"Saved {len(results)} results to {BASELINE_FILE}")
+    if args.fail_on_regression and regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()